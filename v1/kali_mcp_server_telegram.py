@@ -5,10 +5,15 @@ Permite ejecutar herramientas de pentesting usando lenguaje natural con IA
 """
 
 import asyncio
+import contextvars
 import subprocess
 import json
 import os
 import re
+import shlex
+import time
+from array import array
+from collections import Counter
 from dotenv import load_dotenv
 from typing import Any, Optional, Dict, List
 from datetime import datetime
@@ -455,17 +460,54 @@ WORDLISTS = {
     "rockyou": "/usr/share/wordlists/rockyou.txt",
 }
 
+# masscan
+MASSCAN_SUMMARY_INTERVAL = 30  # Segundos entre resúmenes parciales
+MASSCAN_HOSTS_RETURNED = 500  # Hosts con detalle de puertos en el resultado
+MASSCAN_SMALL_PORTS = 256  # Puertos por host antes de pasar a un bitset de 65536 bits
+
+# Receptor de avisos de progreso de la herramienta en curso (ej: resúmenes de masscan)
+tool_progress: contextvars.ContextVar = contextvars.ContextVar(
+    "tool_progress", default=None
+)
+
+
+async def run_command(
+    command, timeout: int = 300, input_data: Optional[str] = None
+) -> dict:
+    """
+    Ejecuta un comando del sistema y devuelve el resultado.
+    Con una lista (argv) se lanza directo con exec, sin pasar por /bin/sh;
+    input_data se escribe en el stdin del proceso.
+    """
+    if isinstance(command, list):
+        argv = [str(arg) for arg in command]
+        command = shlex.join(argv)
+    else:
+        argv = None
 
-async def run_command(command: str, timeout: int = 300) -> dict:
-    """Ejecuta un comando del sistema y devuelve el resultado"""
     try:
-        process = await asyncio.create_subprocess_shell(
-            command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
-        )
+        stdin = asyncio.subprocess.PIPE if input_data is not None else None
+        if argv is not None:
+            process = await asyncio.create_subprocess_exec(
+                *argv,
+                stdin=stdin,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        else:
+            process = await asyncio.create_subprocess_shell(
+                command,
+                stdin=stdin,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
 
         try:
             stdout, stderr = await asyncio.wait_for(
-                process.communicate(), timeout=timeout
+                process.communicate(
+                    input_data.encode() if input_data is not None else None
+                ),
+                timeout=timeout,
             )
 
             return {
@@ -487,6 +529,71 @@ async def run_command(command: str, timeout: int = 300) -> dict:
         return {"success": False, "command": command, "error": str(e)}
 
 
+async def stop_process(process, grace: float = 3):
+    """SIGTERM (sudo lo reenvía a su hijo) y SIGKILL si no termina a tiempo"""
+    try:
+        process.terminate()
+        await asyncio.wait_for(process.wait(), timeout=grace)
+    except ProcessLookupError:
+        pass
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+
+
+async def run_command_lines(command: list, on_line, timeout: int = 300) -> dict:
+    """
+    Ejecuta argv y pasa cada línea de stdout a on_line a medida que llega,
+    sin acumular la salida. De stderr solo se guarda la cola.
+    """
+    argv = [str(arg) for arg in command]
+    command = shlex.join(argv)
+    stderr_tail = ""
+
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *argv,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+    except Exception as e:
+        return {"success": False, "command": command, "error": str(e)}
+
+    async def read_stdout():
+        async for raw in process.stdout:
+            on_line(raw.decode("utf-8", errors="ignore"))
+
+    async def read_stderr():
+        nonlocal stderr_tail
+        # Por bloques: el estado de masscan se redibuja con \r, sin saltos de línea
+        while chunk := await process.stderr.read(4096):
+            stderr_tail = (stderr_tail + chunk.decode("utf-8", errors="ignore"))[-4000:]
+
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(read_stdout(), read_stderr(), process.wait()),
+            timeout=timeout,
+        )
+    except asyncio.TimeoutError:
+        return {
+            "success": False,
+            "command": command,
+            "error": f"Comando excedió el timeout de {timeout} segundos",
+            "timed_out": True,
+            "stderr": stderr_tail,
+        }
+    finally:
+        if process.returncode is None:
+            await stop_process(process)
+
+    return {
+        "success": True,
+        "command": command,
+        "stderr": stderr_tail,
+        "returncode": process.returncode,
+    }
+
+
 # Funciones para cada herramienta
 async def tool_nmap(args: dict) -> str:
     """Ejecuta nmap"""
@@ -496,19 +603,22 @@ async def tool_nmap(args: dict) -> str:
     output_format = args.get("output_format", "normal")
 
     scan_options = {
-        "quick": f"-F",
-        "basic": f"-p {ports}",
-        "version": f"-sV -p {ports}",
-        "aggressive": f"-A -p {ports}",
-        "stealth": f"-sS -p {ports}",
-        "udp": f"-sU -p {ports}",
+        "quick": ["-F"],
+        "basic": ["-p", ports],
+        "version": ["-sV", "-p", ports],
+        "aggressive": ["-A", "-p", ports],
+        "stealth": ["-sS", "-p", ports],
+        "udp": ["-sU", "-p", ports],
     }
 
-    verbose_flag = "-v" if output_format == "verbose" else ""
-    xml_flag = "-oX -" if output_format == "xml" else ""
+    argv = ["nmap", *scan_options[scan_type]]
+    if output_format == "verbose":
+        argv.append("-v")
+    if output_format == "xml":
+        argv += ["-oX", "-"]
+    argv += target.split()  # varios objetivos separados por espacios
 
-    command = f"nmap {scan_options[scan_type]} {verbose_flag} {xml_flag} {target}"
-    result = await run_command(command, timeout=600)
+    result = await run_command(argv, timeout=600)
 
     return json.dumps(result, indent=2)
 
@@ -516,12 +626,15 @@ async def tool_nmap(args: dict) -> str:
 async def tool_nikto(args: dict) -> str:
     """Ejecuta nikto"""
     target = args["target"]
-    ssl = "-ssl" if args.get("ssl", False) else ""
     port = args.get("port", 80)
     tuning = args.get("tuning", "1234")
 
-    command = f"nikto -h {target} -p {port} {ssl} -Tuning {tuning}"
-    result = await run_command(command, timeout=600)
+    argv = ["nikto", "-h", target, "-p", port]
+    if args.get("ssl", False):
+        argv.append("-ssl")
+    argv += ["-Tuning", tuning]
+
+    result = await run_command(argv, timeout=600)
 
     return json.dumps(result, indent=2)
 
@@ -537,13 +650,14 @@ async def tool_gobuster(args: dict) -> str:
 
     if mode == "dir":
         extensions = args.get("extensions", "php,html,txt")
-        command = f"gobuster dir -u {target} -w {wl_path} -x {extensions} -t {threads}"
+        argv = ["gobuster", "dir", "-u", target, "-w", wl_path, "-x", extensions]
     elif mode == "dns":
-        command = f"gobuster dns -d {target} -w {wl_path} -t {threads}"
+        argv = ["gobuster", "dns", "-d", target, "-w", wl_path]
     elif mode == "vhost":
-        command = f"gobuster vhost -u {target} -w {wl_path} -t {threads}"
+        argv = ["gobuster", "vhost", "-u", target, "-w", wl_path]
+    argv += ["-t", threads]
 
-    result = await run_command(command, timeout=600)
+    result = await run_command(argv, timeout=600)
     return json.dumps(result, indent=2)
 
 
@@ -556,14 +670,22 @@ async def tool_sqlmap(args: dict) -> str:
     data = args.get("data")
     cookie = args.get("cookie")
 
-    command = f"sqlmap -u '{url}' --batch --level={level} --risk={risk} --technique={technique}"
+    argv = [
+        "sqlmap",
+        "-u",
+        url,
+        "--batch",
+        f"--level={level}",
+        f"--risk={risk}",
+        f"--technique={technique}",
+    ]
 
     if data:
-        command += f" --data='{data}'"
+        argv.append(f"--data={data}")
     if cookie:
-        command += f" --cookie='{cookie}'"
+        argv.append(f"--cookie={cookie}")
 
-    result = await run_command(command, timeout=600)
+    result = await run_command(argv, timeout=600)
     return json.dumps(result, indent=2)
 
 
@@ -571,10 +693,13 @@ async def tool_whatweb(args: dict) -> str:
     """Ejecuta whatweb"""
     target = args["target"]
     aggression = args.get("aggression", 1)
-    verbose = "-v" if args.get("verbose", True) else ""
 
-    command = f"whatweb -a {aggression} {verbose} {target}"
-    result = await run_command(command, timeout=120)
+    argv = ["whatweb", "-a", aggression]
+    if args.get("verbose", True):
+        argv.append("-v")
+    argv.append(target)
+
+    result = await run_command(argv, timeout=120)
 
     return json.dumps(result, indent=2)
 
@@ -588,10 +713,12 @@ async def tool_hydra(args: dict) -> str:
     threads = args.get("threads", 4)
     port = args.get("port")
 
-    port_flag = f"-s {port}" if port else ""
+    argv = ["hydra", "-l", username, "-P", password_list, "-t", threads]
+    if port:
+        argv += ["-s", port]
+    argv += [target, service]
 
-    command = f"hydra -l {username} -P {password_list} -t {threads} {port_flag} {target} {service}"
-    result = await run_command(command, timeout=1800)
+    result = await run_command(argv, timeout=1800)
 
     return json.dumps(result, indent=2)
 
@@ -601,15 +728,18 @@ async def tool_netcat(args: dict) -> str:
     host = args["host"]
     port = args["port"]
     timeout = args.get("timeout", 5)
-    udp = "-u" if args.get("udp", False) else ""
     send_data = args.get("send_data")
 
-    if send_data:
-        command = f"echo '{send_data}' | nc -w {timeout} {udp} {host} {port}"
-    else:
-        command = f"nc -w {timeout} -vz {udp} {host} {port}"
+    argv = ["nc", "-w", timeout]
+    if not send_data:
+        argv.append("-vz")
+    if args.get("udp", False):
+        argv.append("-u")
+    argv += [host, port]
 
-    result = await run_command(command, timeout=timeout + 5)
+    # Los datos van por stdin (antes: echo ... | nc)
+    input_data = f"{send_data}\n" if send_data else None
+    result = await run_command(argv, timeout=timeout + 5, input_data=input_data)
     return json.dumps(result, indent=2)
 
 
@@ -619,8 +749,11 @@ async def tool_dig(args: dict) -> str:
     record_type = args.get("record_type", "A")
     dns_server = args.get("dns_server", "")
 
-    command = f"dig {domain} {record_type} {dns_server if dns_server else ''}"
-    result = await run_command(command, timeout=30)
+    argv = ["dig", domain, record_type]
+    if dns_server:
+        argv.append(dns_server if dns_server.startswith("@") else f"@{dns_server}")
+
+    result = await run_command(argv, timeout=30)
 
     return json.dumps(result, indent=2)
 
@@ -629,8 +762,7 @@ async def tool_whois(args: dict) -> str:
     """Ejecuta whois"""
     target = args["target"]
 
-    command = f"whois {target}"
-    result = await run_command(command, timeout=30)
+    result = await run_command(["whois", target], timeout=30)
 
     return json.dumps(result, indent=2)
 
@@ -640,20 +772,154 @@ async def tool_traceroute(args: dict) -> str:
     target = args["target"]
     max_hops = args.get("max_hops", 30)
 
-    command = f"traceroute -m {max_hops} {target}"
-    result = await run_command(command, timeout=120)
+    result = await run_command(["traceroute", "-m", max_hops, target], timeout=120)
 
     return json.dumps(result, indent=2)
 
 
+def _to_bitset(ports) -> bytearray:
+    bits = bytearray(8192)
+    for port in ports:
+        bits[port >> 3] |= 1 << (port & 7)
+    return bits
+
+
+def _iter_ports(ports):
+    """Puertos en orden de un array de 16 bits o de un bitset"""
+    if isinstance(ports, bytearray):
+        for index, byte in enumerate(ports):
+            if byte:
+                for bit in range(8):
+                    if byte >> bit & 1:
+                        yield index * 8 + bit
+    else:
+        yield from sorted(ports)
+
+
+def _format_ports(ports) -> str:
+    """Puertos como rangos compactos (ej: 22,80,8000-8010)"""
+    ranges = []
+    for port in _iter_ports(ports):
+        if ranges and ranges[-1][1] == port - 1:
+            ranges[-1][1] = port
+        else:
+            ranges.append([port, port])
+    return ",".join(
+        str(start) if start == end else f"{start}-{end}" for start, end in ranges
+    )
+
+
+def _ip_sort_key(ip: str):
+    try:
+        return (0, tuple(int(part) for part in ip.split(".")))
+    except ValueError:
+        return (1, ip)
+
+
+class MasscanAggregator:
+    """
+    Agrega la salida -oL de masscan línea a línea: puertos abiertos por
+    host y protocolo. Un host guarda sus puertos en un array de 16 bits y
+    pasa a un bitset de 8 KB cuando tiene muchos, así la memoria sigue a
+    los hosts que responden y no a las líneas de salida.
+    """
+
+    def __init__(self):
+        self.hosts = {}  # (ip, protocolo) -> array("H") o bytearray(8192)
+        self.port_counts = Counter()  # "puerto/protocolo" -> hosts
+        self.open_ports = 0
+        self.lines = 0
+        self.started = time.time()
+
+    def feed_line(self, line: str):
+        # open tcp 80 10.0.0.1 1690000000
+        self.lines += 1
+        parts = line.split()
+        if len(parts) < 4 or parts[0] != "open" or not parts[2].isdigit():
+            return
+        protocol, port, ip = parts[1], int(parts[2]), parts[3]
+
+        key = (ip, protocol)
+        ports = self.hosts.get(key)
+        if ports is None:
+            ports = self.hosts[key] = array("H")
+        if isinstance(ports, bytearray):
+            if ports[port >> 3] >> (port & 7) & 1:
+                return
+            ports[port >> 3] |= 1 << (port & 7)
+        else:
+            if port in ports:
+                return
+            ports.append(port)
+            if len(ports) > MASSCAN_SMALL_PORTS:
+                self.hosts[key] = _to_bitset(ports)
+
+        self.open_ports += 1
+        self.port_counts[f"{port}/{protocol}"] += 1
+
+    def summary(self, top: int = 10) -> dict:
+        return {
+            "hosts": len({ip for ip, _ in self.hosts}),
+            "open_ports": self.open_ports,
+            "top_ports": self.port_counts.most_common(top),
+            "lines": self.lines,
+            "elapsed": round(time.time() - self.started, 1),
+        }
+
+    def results(self, max_hosts: int = MASSCAN_HOSTS_RETURNED) -> dict:
+        """ip -> "22,80,443/tcp 53/udp" para los primeros hosts"""
+        by_ip = {}
+        for ip, protocol in sorted(self.hosts, key=lambda key: _ip_sort_key(key[0])):
+            if ip not in by_ip and len(by_ip) >= max_hosts:
+                break
+            ports = f"{_format_ports(self.hosts[(ip, protocol)])}/{protocol}"
+            by_ip[ip] = f"{by_ip[ip]} {ports}" if ip in by_ip else ports
+        return by_ip
+
+    def render_summary(self) -> str:
+        summary = self.summary(top=5)
+        top = ", ".join(f"{port} ({count})" for port, count in summary["top_ports"])
+        return (
+            f"masscan: {summary['hosts']} hosts, {summary['open_ports']} puertos abiertos "
+            f"en {summary['elapsed']}s" + (f"\nTop: {top}" if top else "")
+        )
+
+
 async def tool_masscan(args: dict) -> str:
-    """Ejecuta masscan"""
+    """Ejecuta masscan (salida -oL procesada en streaming)"""
     target = args["target"]
     ports = args.get("ports", "1-1000")
     rate = args.get("rate", 100)
 
-    command = f"sudo masscan {target} -p{ports} --rate={rate}"
-    result = await run_command(command, timeout=600)
+    argv = ["sudo", "masscan", *target.split(), f"-p{ports}", f"--rate={rate}"]
+    argv += ["-oL", "-"]  # una línea por puerto abierto, a stdout
+    aggregator = MasscanAggregator()
+    progress = tool_progress.get()
+
+    async def report_progress():
+        while True:
+            await asyncio.sleep(MASSCAN_SUMMARY_INTERVAL)
+            try:
+                await progress(aggregator.render_summary())
+            except Exception as e:
+                print(f"⚠️ Error enviando progreso de masscan: {e}")
+
+    reporter = asyncio.create_task(report_progress()) if progress else None
+    try:
+        result = await run_command_lines(argv, aggregator.feed_line, timeout=600)
+    finally:
+        if reporter is not None:
+            reporter.cancel()
+
+    # También con timeout: lo encontrado hasta el corte
+    hosts = aggregator.results()
+    result["summary"] = aggregator.summary()
+    result["hosts"] = hosts
+    lines = [aggregator.render_summary(), ""]
+    lines += [f"{ip}: {ports}" for ip, ports in hosts.items()]
+    if result["summary"]["hosts"] > len(hosts):
+        lines.append(f"... y {result['summary']['hosts'] - len(hosts)} hosts más")
+    result["stdout"] = "\n".join(lines)
 
     return json.dumps(result, indent=2)
 
@@ -671,8 +937,7 @@ async def tool_enum4linux(args: dict) -> str:
         "password_policy": "-P",
     }
 
-    command = f"enum4linux {flags[scan_type]} {target}"
-    result = await run_command(command, timeout=300)
+    result = await run_command(["enum4linux", flags[scan_type], target], timeout=300)
 
     return json.dumps(result, indent=2)
 
@@ -680,10 +945,12 @@ async def tool_enum4linux(args: dict) -> str:
 async def tool_searchsploit(args: dict) -> str:
     """Ejecuta searchsploit"""
     query = args["query"]
-    exact = "--exact" if args.get("exact", False) else ""
+    argv = ["searchsploit"]
+    if args.get("exact", False):
+        argv.append("--exact")
+    argv += query.split()  # searchsploit combina los términos
 
-    command = f"searchsploit {exact} {query}"
-    result = await run_command(command, timeout=30)
+    result = await run_command(argv, timeout=30)
 
     return json.dumps(result, indent=2)
 
@@ -694,11 +961,11 @@ async def tool_wpscan(args: dict) -> str:
     enumerate = args.get("enumerate", "vp,vt,u")
     api_token = args.get("api_token")
 
-    command = f"wpscan --url {url} --enumerate {enumerate}"
+    argv = ["wpscan", "--url", url, "--enumerate", enumerate]
     if api_token:
-        command += f" --api-token {api_token}"
+        argv += ["--api-token", api_token]
 
-    result = await run_command(command, timeout=600)
+    result = await run_command(argv, timeout=600)
     return json.dumps(result, indent=2)
 
 
@@ -1003,8 +1270,15 @@ async def handle_ai_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 )
                 return
 
+            async def send_progress(text: str):
+                await update.message.reply_text(f"📊 {text}")
+
             handler = TOOL_HANDLERS[tool_name]
-            result = await handler(parameters)
+            token = tool_progress.set(send_progress)
+            try:
+                result = await handler(parameters)
+            finally:
+                tool_progress.reset(token)
             result_data = json.loads(result)
 
             if result_data.get("success"):
@@ -21,6 +21,7 @@ class AIAssistant:
         
         self.user_contexts = {}  # Contexto por usuario
         self.tool_discovery = get_tool_discovery()
+        self._prompt_tools_version = None
         self.system_prompt = self._load_system_prompt()
     
     def _load_system_prompt(self) -> str:
@@ -35,11 +36,18 @@ class AIAssistant:
             prompt = "Eres un asistente de pentesting profesional y amigable."
         
         # Insertar herramientas instaladas
+        self._prompt_tools_version = self.tool_discovery.tools_version
         tools_info = self._get_installed_tools_summary()
         prompt = prompt.replace("{INSTALLED_TOOLS}", tools_info)
         
         return prompt
     
+    def _get_system_prompt(self) -> str:
+        """Devuelve el prompt, regenerándolo si cambiaron las herramientas"""
+        if self._prompt_tools_version != self.tool_discovery.tools_version:
+            self.system_prompt = self._load_system_prompt()
+        return self.system_prompt
+    
     def _get_installed_tools_summary(self) -> str:
         """Genera resumen de herramientas instaladas"""
         summary = "HERRAMIENTAS INSTALADAS EN ESTE SISTEMA:\\n\\n"
@@ -47,16 +55,20 @@ class AIAssistant:
         # Agrupar por categoría
         categories = self.tool_discovery.get_all_categories()
         
-        for category in sorted(categories):
+        for category in categories:
             tools = self.tool_discovery.get_tools_by_category(category)
             if tools:
                 cat_name = category.replace("_", " ").title()
                 summary += f"{cat_name}:\\n"
-                for tool in sorted(tools):
+                for tool in tools:
                     info = self.tool_discovery.get_tool_info(tool)
                     summary += f"  - {tool}: {info.get('description', 'N/A')}\\n"
                 summary += "\\n"
         
+        catalog = self.tool_discovery.get_catalog()
+        if catalog is not None:
+            summary += f"Además hay {len(catalog)} ejecutables en el sistema; cualquiera puede usarse como herramienta genérica.\\n"
+        
         return summary
     
     def is_available(self) -> bool:
@@ -85,7 +97,7 @@ class AIAssistant:
         context = self.user_contexts.get(user_id, [])
         
         # Construir mensajes
-        messages = [{"role": "system", "content": self.system_prompt}]
+        messages = [{"role": "system", "content": self._get_system_prompt()}]
         
         # Agregar contexto previo (últimos N mensajes)
         for ctx in context[-AI_MAX_CONTEXT:]:
@@ -125,14 +137,26 @@ class AIAssistant:
             # Si la herramienta no está instalada, verificar y ofrecer instalación
             if "tool" in parsed:
                 tool_name = parsed["tool"]
-                if not self.tool_discovery.check_tool_installed(tool_name):
+                match = await self.tool_discovery.resolve(tool_name)
+                # Un parecido difuso no cambia el binario a ejecutar: solo se sugiere
+                if match is None or match["method"] == "fuzzy":
                     install_info = self.tool_discovery.suggest_install(tool_name)
+                    explanation = f"{tool_name} no está instalada."
+                    if match is not None:
+                        explanation += (
+                            f" ¿Quisiste decir {match['tool']}? "
+                            f"(parecido {match['confidence']:.0%}; pídela por su nombre para usarla)"
+                        )
                     return {
                         "tool_not_installed": tool_name,
                         "install_command": install_info["install_command"],
                         "offer_install": True,
-                        "explanation": f"{tool_name} no está instalada. ¿Quieres que la instale?"
+                        "suggested_tool": match["tool"] if match else None,
+                        "explanation": f"{explanation} ¿Quieres que la instale?"
                     }
+                if match["tool"] != tool_name:
+                    print(f"🔁 {tool_name} -> {match['tool']} ({match['method']}, {match['confidence']})")
+                    parsed["tool"] = match["tool"]
             
             return parsed
             
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+bench_discovery.py - Benchmark de arranque de ToolDiscovery
+
+Crea un directorio de binarios sintético con N ejecutables falsos (algunos
+lentos o colgados al pedir --version), ejecuta ToolDiscovery contra él y
+reporta tiempo, número de subprocesos y pico de RSS de cada fase.
+
+El pico de la fase sale de VmHWM, que se reinicia antes de cada fase
+escribiendo 5 en /proc/self/clear_refs (Linux). ru_maxrss no se puede
+reiniciar: se reporta aparte como pico acumulado del proceso.
+
+Ejemplos:
+    python3 bench_discovery.py --tools 500
+    python3 bench_discovery.py --tools 200 --hanging 5 --max-scan-ms 100
+"""
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+FAST_SCRIPT = '#!/bin/sh\necho "{name} 1.0.0"\n'
+SLOW_SCRIPT = '#!/bin/sh\nsleep {delay}\necho "{name} 2.0.0"\n'
+HANGING_SCRIPT = '#!/bin/sh\nexec sleep 3600\n'
+
+
+class CountingPopen(subprocess.Popen):
+    """Popen que cuenta cuántos procesos se lanzan"""
+    
+    count = 0
+    
+    def __init__(self, *args, **kwargs):
+        CountingPopen.count += 1
+        super().__init__(*args, **kwargs)
+
+
+def build_fake_bin_dir(root: Path, total: int, slow: int, hanging: int, slow_delay: float) -> dict:
+    """Crea los ejecutables falsos y devuelve el catálogo de herramientas conocidas"""
+    bin_dir = root / "bin"
+    bin_dir.mkdir(parents=True)
+    
+    tools = {}
+    for i in range(total):
+        name = f"faketool{i:05d}"
+        if i < hanging:
+            script = HANGING_SCRIPT
+        elif i < hanging + slow:
+            script = SLOW_SCRIPT.format(name=name, delay=slow_delay)
+        else:
+            script = FAST_SCRIPT.format(name=name)
+        
+        path = bin_dir / name
+        path.write_text(script)
+        path.chmod(0o755)
+        tools[name] = {"category": f"category_{i % 8}", "description": f"Fake tool {i}"}
+    
+    return tools
+
+
+def reset_peak_rss() -> bool:
+    """Reinicia VmHWM al RSS actual; False si el kernel no lo permite"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_kb() -> int:
+    """VmHWM: pico de RSS desde el último reinicio (KB)"""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1])
+    return 0
+
+
+def cumulative_rss_kb() -> dict:
+    """ru_maxrss del proceso y del hijo más grande: picos de toda la vida, solo suben (KB en Linux)"""
+    return {
+        "cumulative_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "children_kb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    }
+
+
+def measure(name: str, func) -> dict:
+    """Ejecuta una fase y mide tiempo, subprocesos y pico de RSS propio de la fase"""
+    CountingPopen.count = 0
+    phase_peak = reset_peak_rss()
+    start = time.perf_counter()
+    func()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    result = {
+        "phase": name,
+        "wall_ms": round(elapsed_ms, 2),
+        "subprocesses": CountingPopen.count,
+        "phase_peak_kb": peak_rss_kb() if phase_peak else None
+    }
+    result.update(cumulative_rss_kb())
+    return result
+
+
+def run_benchmark(args) -> list:
+    # La configuración se lee al importar: fijar el entorno antes
+    root = Path(tempfile.mkdtemp(prefix="kalibot_bench_"))
+    os.environ["DISCOVERY_CACHE_PATH"] = str(root / "cache.json")
+    os.environ["DISCOVERY_VERSION_WORKERS"] = str(args.workers)
+    os.environ["DISCOVERY_SCAN_BUDGET"] = str(args.budget)
+    
+    import tool_discovery
+    
+    subprocess.Popen = CountingPopen
+    tools = build_fake_bin_dir(root, args.tools, args.slow, args.hanging, args.slow_delay)
+    
+    def make_discovery():
+        discovery = tool_discovery.ToolDiscovery()
+        discovery.bin_paths = [str(root / "bin")]
+        discovery.common_kali_tools = dict(tools)
+        return discovery
+    
+    results = []
+    quiet = open(os.devnull, "w")
+    real_stdout = sys.stdout
+    try:
+        sys.stdout = quiet
+        
+        cold = make_discovery()
+        results.append(measure("cold_scan", lambda: cold.scan_installed_tools(use_cache=False)))
+        results.append(measure("version_warmup", cold.warm_versions))
+        
+        warm = make_discovery()
+        results.append(measure("cached_scan", warm.scan_installed_tools))
+        
+        names = list(tools)[:: max(1, len(tools) // 100)]
+        lookups = names + [name.replace("tool", "tol") for name in names]
+        results.append(measure(
+            f"resolve_x{len(lookups)}",
+            lambda: [warm.resolve_tool_name(name) for name in lookups]
+        ))
+    finally:
+        sys.stdout = real_stdout
+        quiet.close()
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+    
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de arranque de ToolDiscovery")
+    parser.add_argument("--tools", type=int, default=200, help="Ejecutables falsos a crear")
+    parser.add_argument("--slow", type=int, default=10, help="Cuántos tardan en responder --version")
+    parser.add_argument("--slow-delay", type=float, default=0.5, help="Segundos de demora de los lentos")
+    parser.add_argument("--hanging", type=int, default=2, help="Cuántos se cuelgan con --version")
+    parser.add_argument("--workers", type=int, default=8, help="DISCOVERY_VERSION_WORKERS")
+    parser.add_argument("--budget", type=float, default=10, help="DISCOVERY_SCAN_BUDGET en segundos")
+    parser.add_argument("--max-scan-ms", type=float, help="Falla si cold_scan supera este tiempo")
+    parser.add_argument("--max-cached-ms", type=float, help="Falla si cached_scan supera este tiempo")
+    parser.add_argument("--max-warmup-ms", type=float, help="Falla si version_warmup supera este tiempo")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    parser.add_argument("--keep", action="store_true", help="No borrar el directorio sintético")
+    args = parser.parse_args()
+    
+    results = run_benchmark(args)
+    
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"📊 ToolDiscovery con {args.tools} herramientas "
+              f"({args.slow} lentas, {args.hanging} colgadas, {args.workers} workers)\n")
+        print(
+            f"{'Fase':<20}{'Tiempo (ms)':>14}{'Procesos':>10}"
+            f"{'Pico fase':>12}{'Pico acum.':>12}{'Pico hijos':>12}  (KB)"
+        )
+        for r in results:
+            phase_peak = r["phase_peak_kb"] if r["phase_peak_kb"] is not None else "n/d"
+            print(
+                f"{r['phase']:<20}{r['wall_ms']:>14}{r['subprocesses']:>10}"
+                f"{phase_peak:>12}{r['cumulative_kb']:>12}{r['children_kb']:>12}"
+            )
+    
+    limits = {
+        "cold_scan": args.max_scan_ms,
+        "cached_scan": args.max_cached_ms,
+        "version_warmup": args.max_warmup_ms
+    }
+    failed = [
+        r for r in results
+        if limits.get(r["phase"]) is not None and r["wall_ms"] > limits[r["phase"]]
+    ]
+    for r in failed:
+        print(f"❌ Regresión: {r['phase']} tardó {r['wall_ms']} ms (límite {limits[r['phase']]} ms)")
+    
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -39,6 +39,26 @@ KALI_BIN_PATHS = [
     "/sbin"
 ]
 
+# Descubrimiento de herramientas
+DISCOVERY_VERSION_WORKERS = int(os.getenv("DISCOVERY_VERSION_WORKERS", "8"))  # Sondeos de versión en paralelo
+DISCOVERY_VERSION_TIMEOUT = 3  # Segundos por intento de flag de versión
+DISCOVERY_SCAN_BUDGET = float(os.getenv("DISCOVERY_SCAN_BUDGET", "15"))  # Tope global para todo el sondeo
+# Calcular versiones en segundo plano cuando el bot ya está atendiendo
+DISCOVERY_WARM_VERSIONS = os.getenv("DISCOVERY_WARM_VERSIONS", "true").lower() == "true"
+# Vigilar /usr/bin y compañía para detectar instalaciones sin reescanear todo
+DISCOVERY_WATCH = os.getenv("DISCOVERY_WATCH", "true").lower() == "true"
+DISCOVERY_POLL_INTERVAL = 5  # Segundos entre sondeos si inotify no está disponible
+# Indexar todos los ejecutables (no solo las herramientas conocidas) con datos de dpkg
+DISCOVERY_FULL_CATALOG = os.getenv("DISCOVERY_FULL_CATALOG", "false").lower() == "true"
+# Confianza mínima para aceptar un nombre de herramienta corregido (0-1)
+TOOL_MATCH_MIN_CONFIDENCE = 0.8
+# Caché en disco del descubrimiento (vacío para desactivarla)
+DISCOVERY_CACHE_PATH = os.getenv(
+    "DISCOVERY_CACHE_PATH",
+    str(Path.home() / ".cache" / "kalibot" / "tools_cache.json")
+)
+DISCOVERY_CACHE_SAVE_DELAY = 5  # Segundos para agrupar escrituras de la caché tras sondeos sueltos
+
 # Wordlists comunes
 WORDLISTS = {
     "common": "/usr/share/wordlists/dirb/common.txt",
@@ -53,6 +73,7 @@ TOOL_TIMEOUTS = {
     "nmap": 600,
     "nikto": 600,
     "gobuster": 600,
+    "dirb": 600,
     "sqlmap": 600,
     "whatweb": 120,
     "hydra": 1800,
@@ -68,6 +89,97 @@ TOOL_TIMEOUTS = {
     "default": 300
 }
 
+# Salida en streaming de las herramientas
+STREAM_CHUNK_SIZE = 64 * 1024  # Bytes por lectura del pipe (y largo máximo de línea)
+STREAM_QUEUE_SIZE = 256  # Eventos en cola antes de frenar al proceso
+PROCESS_KILL_GRACE = 3  # Segundos entre SIGTERM y SIGKILL al cortar un comando
+
+# Planificador de ejecuciones
+SCHEDULER_CAPACITY = int(os.getenv("SCHEDULER_CAPACITY", "8"))  # Unidades de peso simultáneas en la máquina
+SCHEDULER_MAX_PER_USER = int(os.getenv("SCHEDULER_MAX_PER_USER", "2"))  # Ejecuciones simultáneas por usuario
+WEIGHT_COST = {"light": 1, "medium": 2, "heavy": 4}  # Unidades que consume cada clase
+WEIGHT_TOOL_LIMIT = {"light": 8, "medium": 3, "heavy": 1}  # Ejecuciones simultáneas de una misma herramienta
+TOOL_WEIGHTS = {
+    "masscan": "heavy",
+    "hydra": "heavy",
+    "sqlmap": "heavy",
+    "wpscan": "heavy",
+    "nmap": "medium",
+    "nikto": "medium",
+    "gobuster": "medium",
+    "dirb": "medium",
+    "enum4linux": "medium",
+    "msfvenom": "medium",
+    "git_clone": "medium",
+    "install_package": "medium",
+    "download": "medium",
+    "whatweb": "light",
+    "dig": "light",
+    "whois": "light",
+    "searchsploit": "light",
+    "traceroute": "light",
+    "netcat": "light",
+    "read_file": "light",
+    "move_file": "light",
+    "copy_file": "light",
+    "default": "medium"
+}
+
+# Backend de dig: "binary" lanza dig, "native" usa dns_resolver.py en proceso
+DIG_BACKEND = os.getenv("DIG_BACKEND", "binary").lower()
+DNS_TIMEOUT = 2  # Segundos por intento
+DNS_RETRIES = 2
+DNS_MAX_CONCURRENCY = 100  # Consultas simultáneas en un lote
+DNS_CACHE_SIZE = 10000  # Respuestas en caché
+DNS_NEGATIVE_TTL = 60  # Respuestas sin registros ni SOA
+
+# Resultados de nmap en XML
+NMAP_RENDER_HOSTS = 50  # Hosts que se muestran en el resumen de texto
+NMAP_REPORTS_KEPT = 10  # Reportes parseados que se guardan en memoria para consultas
+
+# Almacén de resultados de escaneos en SQLite (vacío para solo memoria)
+RESULTS_DB_PATH = os.getenv(
+    "RESULTS_DB_PATH",
+    str(Path.home() / ".cache" / "kalibot" / "results.db")
+)
+
+# Hallazgos de fuerza bruta web/DNS (gobuster, dirb): solo se devuelven los nuevos por objetivo
+FINDINGS_DIR = os.getenv(
+    "FINDINGS_DIR",
+    str(Path.home() / ".cache" / "kalibot" / "findings")
+)
+FINDINGS_SETS_KEPT = 32  # Objetivos con su historial abierto en memoria
+FINDINGS_RETURNED = 200  # Hallazgos nuevos que van en el resultado
+
+# Caché de resultados de herramientas de reconocimiento (TTL máximo en segundos)
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+RESULT_CACHE_MAX_BYTES = 32 * 1024 * 1024
+RESULT_CACHE_TTLS = {
+    "whois": 6 * 3600,
+    "dig": 3600,  # se usa el TTL mínimo de la respuesta, hasta este tope
+    "whatweb": 1800,
+    "searchsploit": 7 * 86400  # la clave incluye la versión del índice de exploitdb
+}
+RESULT_CACHE_NEGATIVE_TTL = 60  # dig sin registros en la respuesta
+EXPLOITDB_INDEX = "/usr/share/exploitdb/files_exploits.csv"
+
+# Trabajos en segundo plano
+JOB_HISTORY_SIZE = 100  # Trabajos terminados que se recuerdan para /jobs
+JOB_OUTPUT_TAIL_CHARS = 3000  # Salida parcial guardada por trabajo
+
+# Captura de salida: a partir del umbral se vuelca a disco y en memoria quedan inicio y cola
+OUTPUT_SPILL_THRESHOLD = 1024 * 1024  # Caracteres en memoria antes de volcar
+OUTPUT_HEAD_CHARS = 8 * 1024
+OUTPUT_TAIL_CHARS = 32 * 1024
+OUTPUT_SPILL_DIR = "/tmp/kali_bot_outputs"
+OUTPUT_SPILL_MAX_AGE = 24 * 3600  # Segundos antes de borrar volcados viejos
+OUTPUT_SPILL_CLEANUP_INTERVAL = 3600  # Segundos entre limpiezas de volcados viejos
+
+# Salida en vivo en Telegram (un mensaje editado con la cola de la salida)
+LIVE_OUTPUT_ENABLED = os.getenv("LIVE_OUTPUT_ENABLED", "true").lower() == "true"
+LIVE_OUTPUT_INTERVAL = 3.0  # Segundos mínimos entre ediciones del mensaje
+LIVE_OUTPUT_TAIL_CHARS = 3000  # Caracteres de la cola que se muestran
+
 # Configuración de IA
 AI_SYSTEM_PROMPT_PATH = Path(__file__).parent / "prompts" / "ai_assistant.txt"
 AI_MAX_CONTEXT = 10  # Últimos N mensajes a recordar
@@ -0,0 +1,500 @@
+"""
+dns_resolver.py - Resolver DNS asíncrono en proceso (backend nativo para dig)
+
+Habla el protocolo DNS directamente: consultas UDP por un socket compartido
+por servidor, reintento por TCP si la respuesta viene truncada, caché que
+respeta los TTL y consultas en lote. La salida imita el formato de dig.
+"""
+
+import asyncio
+import ipaddress
+import random
+import struct
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import (
+    DNS_TIMEOUT,
+    DNS_RETRIES,
+    DNS_MAX_CONCURRENCY,
+    DNS_CACHE_SIZE,
+    DNS_NEGATIVE_TTL
+)
+
+RECORD_TYPES = {
+    "A": 1, "NS": 2, "CNAME": 5, "SOA": 6, "PTR": 12, "MX": 15,
+    "TXT": 16, "AAAA": 28, "SRV": 33, "CAA": 257, "ANY": 255
+}
+RECORD_NAMES = {code: name for name, code in RECORD_TYPES.items()}
+
+RCODES = {
+    0: "NOERROR", 1: "FORMERR", 2: "SERVFAIL", 3: "NXDOMAIN",
+    4: "NOTIMP", 5: "REFUSED"
+}
+
+# Bits de la cabecera
+FLAG_QR = 0x8000
+FLAG_AA = 0x0400
+FLAG_TC = 0x0200
+FLAG_RD = 0x0100
+FLAG_RA = 0x0080
+
+CLASS_IN = 1
+
+
+class DNSError(Exception):
+    """Fallo de transporte o respuesta inválida"""
+
+
+def default_nameserver() -> str:
+    """Primer nameserver de /etc/resolv.conf"""
+    try:
+        with open("/etc/resolv.conf") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0] == "nameserver":
+                    return parts[1]
+    except OSError:
+        pass
+    return "8.8.8.8"
+
+
+# === FORMATO DE MENSAJES ===
+
+def encode_name(name: str) -> bytes:
+    """Nombre en formato de etiquetas (sin compresión)"""
+    encoded = b""
+    for label in name.rstrip(".").split("."):
+        if not label:
+            continue
+        try:
+            raw = label.encode("ascii")
+        except UnicodeEncodeError:
+            try:
+                raw = label.encode("idna")
+            except UnicodeError as e:
+                raise DNSError(f"Nombre inválido: {name} ({e})") from e
+        if len(raw) > 63:
+            raise DNSError(f"Etiqueta demasiado larga: {label}")
+        encoded += bytes([len(raw)]) + raw
+    return encoded + b"\x00"
+
+
+def build_query(query_id: int, name: str, record_type: str) -> bytes:
+    """Consulta estándar con recursión deseada"""
+    header = struct.pack("!HHHHHH", query_id, FLAG_RD, 1, 0, 0, 0)
+    question = encode_name(name) + struct.pack("!HH", RECORD_TYPES[record_type], CLASS_IN)
+    return header + question
+
+
+def _read_name(data: bytes, offset: int) -> Tuple[str, int]:
+    """Lee un nombre (con punteros de compresión); devuelve (nombre, siguiente offset)"""
+    labels = []
+    end = None
+    jumps = 0
+    while True:
+        if offset >= len(data):
+            raise DNSError("Nombre fuera del mensaje")
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if offset + 1 >= len(data):
+                raise DNSError("Puntero truncado")
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            jumps += 1
+            if jumps > 64:
+                raise DNSError("Bucle de compresión")
+            continue
+        offset += 1
+        if length == 0:
+            break
+        labels.append(data[offset:offset + length].decode("ascii", errors="replace"))
+        offset += length
+    return ".".join(labels) + ".", (end if end is not None else offset)
+
+
+def _decode_rdata(data: bytes, offset: int, length: int, rtype: int) -> str:
+    rdata = data[offset:offset + length]
+    if rtype == RECORD_TYPES["A"] and length == 4:
+        return str(ipaddress.IPv4Address(rdata))
+    if rtype == RECORD_TYPES["AAAA"] and length == 16:
+        return str(ipaddress.IPv6Address(rdata))
+    if rtype in (RECORD_TYPES["NS"], RECORD_TYPES["CNAME"], RECORD_TYPES["PTR"]):
+        return _read_name(data, offset)[0]
+    if rtype == RECORD_TYPES["MX"]:
+        preference = struct.unpack("!H", rdata[:2])[0]
+        return f"{preference} {_read_name(data, offset + 2)[0]}"
+    if rtype == RECORD_TYPES["TXT"]:
+        parts = []
+        pos = 0
+        while pos < length:
+            size = rdata[pos]
+            parts.append('"' + rdata[pos + 1:pos + 1 + size].decode("utf-8", errors="replace") + '"')
+            pos += 1 + size
+        return " ".join(parts)
+    if rtype == RECORD_TYPES["SOA"]:
+        mname, pos = _read_name(data, offset)
+        rname, pos = _read_name(data, pos)
+        serial, refresh, retry, expire, minimum = struct.unpack("!IIIII", data[pos:pos + 20])
+        return f"{mname} {rname} {serial} {refresh} {retry} {expire} {minimum}"
+    if rtype == RECORD_TYPES["SRV"]:
+        priority, weight, port = struct.unpack("!HHH", rdata[:6])
+        return f"{priority} {weight} {port} {_read_name(data, offset + 6)[0]}"
+    if rtype == RECORD_TYPES["CAA"] and length >= 2:
+        flags, tag_length = rdata[0], rdata[1]
+        tag = rdata[2:2 + tag_length].decode("ascii", errors="replace")
+        value = rdata[2 + tag_length:].decode("utf-8", errors="replace")
+        return f'{flags} {tag} "{value}"'
+    # Tipo desconocido: formato genérico de RFC 3597
+    return f"\\# {length} {rdata.hex()}"
+
+
+def parse_response(data: bytes) -> Dict:
+    """Decodifica un mensaje de respuesta (DNSError si está mal formado o cortado)"""
+    try:
+        return _parse_response(data)
+    except (struct.error, IndexError, UnicodeDecodeError, ValueError) as e:
+        raise DNSError(f"Respuesta mal formada: {e}") from e
+
+
+def _parse_response(data: bytes) -> Dict:
+    if len(data) < 12:
+        raise DNSError("Respuesta demasiado corta")
+    query_id, flags, qdcount, ancount, nscount, arcount = struct.unpack("!HHHHHH", data[:12])
+    offset = 12
+    
+    question = []
+    for _ in range(qdcount):
+        name, offset = _read_name(data, offset)
+        qtype, qclass = struct.unpack("!HH", data[offset:offset + 4])
+        offset += 4
+        question.append({
+            "name": name,
+            "type": RECORD_NAMES.get(qtype, str(qtype)),
+            "class": "IN" if qclass == CLASS_IN else str(qclass)
+        })
+    
+    sections = {"answer": [], "authority": [], "additional": []}
+    for section, count in (("answer", ancount), ("authority", nscount), ("additional", arcount)):
+        for _ in range(count):
+            name, offset = _read_name(data, offset)
+            if offset + 10 > len(data):
+                raise DNSError("Registro truncado")
+            rtype, rclass, ttl, rdlength = struct.unpack("!HHIH", data[offset:offset + 10])
+            offset += 10
+            if offset + rdlength > len(data):
+                raise DNSError("Registro truncado")
+            if rtype == 41:
+                # OPT (EDNS): no es un registro real
+                offset += rdlength
+                continue
+            sections[section].append({
+                "name": name,
+                "ttl": ttl,
+                "class": "IN" if rclass == CLASS_IN else str(rclass),
+                "type": RECORD_NAMES.get(rtype, f"TYPE{rtype}"),
+                "data": _decode_rdata(data, offset, rdlength, rtype)
+            })
+            offset += rdlength
+    
+    flag_names = [
+        label for bit, label in (
+            (FLAG_QR, "qr"), (FLAG_AA, "aa"), (FLAG_TC, "tc"), (FLAG_RD, "rd"), (FLAG_RA, "ra")
+        ) if flags & bit
+    ]
+    return {
+        "id": query_id,
+        "status": RCODES.get(flags & 0xF, str(flags & 0xF)),
+        "flags": flag_names,
+        "truncated": bool(flags & FLAG_TC),
+        "question": question,
+        **sections
+    }
+
+
+def check_question(response: Dict, query_id: int, name: str, record_type: str):
+    """DNSError si la respuesta no es de la consulta enviada (ID, nombre, tipo y clase)"""
+    if response["id"] != query_id:
+        raise DNSError(f"ID de respuesta inesperado: {response['id']}")
+    expected = {"name": name.lower(), "type": record_type, "class": "IN"}
+    questions = [dict(q, name=q["name"].lower()) for q in response["question"]]
+    if questions != [expected]:
+        raise DNSError(f"La respuesta no corresponde a {name} {record_type}: {response['question']}")
+
+
+def response_ttl(response: Dict) -> int:
+    """Segundos que vale la respuesta: TTL mínimo o, si no hay respuesta, el mínimo del SOA"""
+    if response["answer"]:
+        return min(record["ttl"] for record in response["answer"])
+    for record in response["authority"]:
+        if record["type"] == "SOA":
+            return min(record["ttl"], int(record["data"].split()[-1]))
+    return DNS_NEGATIVE_TTL
+
+
+def format_dig(response: Dict) -> str:
+    """Texto con el mismo formato que la salida de dig"""
+    question = response["question"][0] if response["question"] else {"name": "", "type": ""}
+    counts = (
+        f"QUERY: {len(response['question'])}, ANSWER: {len(response['answer'])}, "
+        f"AUTHORITY: {len(response['authority'])}, ADDITIONAL: {len(response['additional'])}"
+    )
+    lines = [
+        f"; <<>> kalibot dns_resolver <<>> {question['name']} {question['type']}",
+        ";; Got answer:",
+        f";; ->>HEADER<<- opcode: QUERY, status: {response['status']}, id: {response['id']}",
+        f";; flags: {' '.join(response['flags'])}; {counts}",
+        "",
+        ";; QUESTION SECTION:",
+        f";{question['name']}\t\t\tIN\t{question['type']}",
+    ]
+    for section in ("answer", "authority", "additional"):
+        if response[section]:
+            lines += ["", f";; {section.upper()} SECTION:"]
+            for record in response[section]:
+                lines.append(
+                    f"{record['name']}\t\t{record['ttl']}\t{record['class']}\t{record['type']}\t{record['data']}"
+                )
+    lines += [
+        "",
+        f";; Query time: {response.get('query_time_ms', 0)} msec",
+        f";; SERVER: {response['server']}#{response['port']}({response['server']}) ({response['protocol']})",
+    ]
+    if response.get("cached"):
+        lines.append(";; (desde caché)")
+    return "\n".join(lines) + "\n"
+
+
+# === TRANSPORTE ===
+
+class _UDPProtocol(asyncio.DatagramProtocol):
+    """Socket UDP compartido: reparte las respuestas por ID de consulta"""
+    
+    def __init__(self):
+        self.pending = {}  # id -> future
+        self.transport = None
+    
+    def connection_made(self, transport):
+        self.transport = transport
+    
+    def datagram_received(self, data: bytes, addr):
+        if len(data) < 2:
+            return
+        future = self.pending.pop(struct.unpack("!H", data[:2])[0], None)
+        if future is not None and not future.done():
+            future.set_result(data)
+    
+    def error_received(self, exc):
+        # ICMP port unreachable y similares: no hay forma de saber a qué consulta
+        # corresponde, así que fallan todas las pendientes
+        self._fail_all(exc)
+    
+    def connection_lost(self, exc):
+        self.transport = None
+        self._fail_all(exc or DNSError("Socket cerrado"))
+    
+    def _fail_all(self, exc):
+        pending, self.pending = self.pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(DNSError(str(exc)))
+
+
+class DNSResolver:
+    """Resolver asíncrono con un socket UDP compartido por servidor y caché por TTL"""
+    
+    def __init__(
+        self,
+        server: Optional[str] = None,
+        port: int = 53,
+        timeout: float = DNS_TIMEOUT,
+        retries: int = DNS_RETRIES,
+        cache_size: int = DNS_CACHE_SIZE
+    ):
+        self.server = server or default_nameserver()
+        self.port = port
+        self.timeout = timeout
+        self.retries = retries
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # (nombre, tipo, servidor, puerto) -> (vence, guardado, respuesta)
+        self._endpoints = {}  # (servidor, puerto) -> _UDPProtocol
+        self._endpoint_lock = None
+    
+    async def _get_endpoint(self, server: str, port: int) -> _UDPProtocol:
+        if self._endpoint_lock is None:
+            self._endpoint_lock = asyncio.Lock()
+        async with self._endpoint_lock:
+            protocol = self._endpoints.get((server, port))
+            if protocol is None or protocol.transport is None:
+                loop = asyncio.get_running_loop()
+                _, protocol = await loop.create_datagram_endpoint(
+                    _UDPProtocol,
+                    remote_addr=(server, port)
+                )
+                self._endpoints[(server, port)] = protocol
+            return protocol
+    
+    async def _query_udp(self, packet: bytes, query_id: int, server: str, port: int) -> bytes:
+        protocol = await self._get_endpoint(server, port)
+        future = asyncio.get_running_loop().create_future()
+        protocol.pending[query_id] = future
+        try:
+            protocol.transport.sendto(packet)
+            return await asyncio.wait_for(future, timeout=self.timeout)
+        finally:
+            protocol.pending.pop(query_id, None)
+    
+    async def _query_tcp(self, packet: bytes, server: str, port: int) -> bytes:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(server, port),
+            timeout=self.timeout
+        )
+        try:
+            writer.write(struct.pack("!H", len(packet)) + packet)
+            await writer.drain()
+            size = struct.unpack("!H", await asyncio.wait_for(reader.readexactly(2), self.timeout))[0]
+            return await asyncio.wait_for(reader.readexactly(size), timeout=self.timeout)
+        except EOFError as e:
+            # IncompleteReadError: el servidor cerró la conexión a mitad de respuesta
+            raise DNSError(f"Conexión TCP cerrada por {server}: {e}") from e
+        finally:
+            writer.close()
+    
+    def _new_query_id(self, server: str, port: int) -> int:
+        protocol = self._endpoints.get((server, port))
+        pending = protocol.pending if protocol is not None else {}
+        query_id = random.getrandbits(16)
+        while query_id in pending:
+            query_id = random.getrandbits(16)
+        return query_id
+    
+    async def query(
+        self,
+        name: str,
+        record_type: str = "A",
+        server: Optional[str] = None,
+        port: Optional[int] = None,
+        use_cache: bool = True
+    ) -> Dict:
+        """Resuelve un nombre; la respuesta incluye server, protocol y query_time_ms"""
+        record_type = record_type.upper()
+        if record_type not in RECORD_TYPES:
+            raise DNSError(f"Tipo de registro no soportado: {record_type}")
+        name = name.strip().rstrip(".").lower() + "."
+        server = (server or self.server).lstrip("@")
+        port = port or self.port
+        
+        key = (name, record_type, server, port)
+        if use_cache:
+            cached = self._cache_get(key)
+            if cached is not None:
+                return cached
+        
+        start = time.perf_counter()
+        response = None
+        last_error = None
+        for _ in range(self.retries + 1):
+            query_id = self._new_query_id(server, port)
+            packet = build_query(query_id, name, record_type)
+            try:
+                data = await self._query_udp(packet, query_id, server, port)
+                protocol = "UDP"
+                if len(data) >= 4 and struct.unpack("!H", data[2:4])[0] & FLAG_TC:
+                    # No cupo en UDP (los registros pueden venir cortados): repetir por TCP
+                    data = await self._query_tcp(packet, server, port)
+                    protocol = "TCP"
+                parsed = parse_response(data)
+                # Una respuesta a otra pregunta no se acepta ni se guarda en caché
+                check_question(parsed, query_id, name, record_type)
+                response = parsed
+                break
+            except (asyncio.TimeoutError, OSError, DNSError) as e:
+                last_error = e
+        
+        if response is None:
+            raise DNSError(f"Sin respuesta de {server} para {name} {record_type}: {last_error or 'timeout'}")
+        
+        response.update({
+            "server": server,
+            "port": port,
+            "protocol": protocol,
+            "query_time_ms": round((time.perf_counter() - start) * 1000)
+        })
+        if response["status"] in ("NOERROR", "NXDOMAIN"):
+            self._cache_put(key, response)
+        return response
+    
+    async def resolve_many(
+        self,
+        names: Iterable[str],
+        record_types: Iterable[str] = ("A",),
+        server: Optional[str] = None,
+        use_cache: bool = True
+    ) -> List[Dict]:
+        """
+        Lote de consultas (cada nombre x cada tipo) en paralelo, limitado a
+        DNS_MAX_CONCURRENCY simultáneas. Los fallos vienen como {"error": ...}.
+        """
+        semaphore = asyncio.Semaphore(DNS_MAX_CONCURRENCY)
+        record_types = list(record_types)
+        
+        async def one(name: str, record_type: str) -> Dict:
+            async with semaphore:
+                try:
+                    return await self.query(name, record_type, server=server, use_cache=use_cache)
+                except DNSError as e:
+                    return {"name": name, "type": record_type, "error": str(e)}
+        
+        return await asyncio.gather(*[
+            one(name, record_type) for name in names for record_type in record_types
+        ])
+    
+    def _cache_get(self, key) -> Optional[Dict]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires, stored, response = entry
+        now = time.time()
+        if expires <= now:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        
+        # Como un resolver real: los TTL bajan con el tiempo en caché
+        elapsed = int(now - stored)
+        copy = dict(response, cached=True, query_time_ms=0)
+        for section in ("answer", "authority", "additional"):
+            copy[section] = [
+                dict(record, ttl=max(record["ttl"] - elapsed, 0)) for record in response[section]
+            ]
+        return copy
+    
+    def _cache_put(self, key, response: Dict):
+        ttl = response_ttl(response)
+        if ttl <= 0:
+            return
+        now = time.time()
+        self._cache[key] = (now + ttl, now, response)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+    
+    def close(self):
+        """Cierra los sockets UDP"""
+        for protocol in self._endpoints.values():
+            if protocol.transport is not None:
+                protocol.transport.close()
+        self._endpoints.clear()
+
+
+# Singleton
+_dns_resolver = None
+
+def get_dns_resolver():
+    """Obtiene la instancia global del resolver"""
+    global _dns_resolver
+    if _dns_resolver is None:
+        _dns_resolver = DNSResolver()
+    return _dns_resolver
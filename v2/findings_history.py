@@ -0,0 +1,110 @@
+"""
+findings_history.py - Hallazgos ya reportados por objetivo, para devolver solo los nuevos
+
+Cada hallazgo se guarda como un hash de 8 bytes en un array ordenado (un
+archivo binario por herramienta, modo y objetivo), así el historial ocupa
+8 bytes por entrada en memoria y en disco.
+"""
+
+import hashlib
+import os
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from config import FINDINGS_DIR, FINDINGS_SETS_KEPT
+from result_cache import normalize_target
+
+
+def _digest(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class SeenSet:
+    """Conjunto compacto de hashes: lo guardado va ordenado y se busca con bisect"""
+    
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path
+        self._saved = array("Q")
+        self._added = set()  # nuevos desde el último save()
+        if path is not None and path.exists():
+            self._saved.frombytes(path.read_bytes())
+    
+    def __len__(self) -> int:
+        return len(self._saved) + len(self._added)
+    
+    def __contains__(self, key: str) -> bool:
+        return self._has(_digest(key))
+    
+    def _has(self, digest: int) -> bool:
+        if digest in self._added:
+            return True
+        i = bisect_left(self._saved, digest)
+        return i < len(self._saved) and self._saved[i] == digest
+    
+    def add(self, key: str) -> bool:
+        """Agrega la clave; devuelve True si no estaba"""
+        digest = _digest(key)
+        if self._has(digest):
+            return False
+        self._added.add(digest)
+        return True
+    
+    def save(self):
+        """Mezcla lo nuevo con lo guardado y lo escribe en disco (reemplazo atómico)"""
+        if not self._added:
+            return
+        self._saved = array("Q", sorted([*self._saved, *self._added]))
+        self._added = set()
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_bytes(self._saved.tobytes())
+        os.replace(tmp, self.path)
+
+
+class FindingsHistory:
+    """
+    Historial de hallazgos por (herramienta, modo, objetivo). Los conjuntos
+    abiertos se comparten entre ejecuciones del mismo objetivo.
+    """
+    
+    def __init__(self, directory: Optional[str] = FINDINGS_DIR, max_open: int = FINDINGS_SETS_KEPT):
+        self.directory = Path(directory) if directory else None
+        self.max_open = max_open
+        self._sets = OrderedDict()
+    
+    @staticmethod
+    def _normalize_target(target: str) -> str:
+        # Las rutas distinguen mayúsculas: solo esquema y host van en minúsculas
+        return normalize_target(target.strip()).rstrip("/")
+    
+    def seen(self, tool_name: str, mode: str, target: str) -> SeenSet:
+        """Conjunto de hallazgos ya reportados para ese objetivo"""
+        name = hashlib.blake2b(
+            f"{tool_name}|{mode}|{self._normalize_target(target)}".encode("utf-8"),
+            digest_size=8
+        ).hexdigest()
+        seen = self._sets.get(name)
+        if seen is None:
+            path = self.directory / f"{tool_name}-{name}.bin" if self.directory else None
+            seen = self._sets[name] = SeenSet(path)
+            while len(self._sets) > self.max_open:
+                _, oldest = self._sets.popitem(last=False)
+                oldest.save()
+        self._sets.move_to_end(name)
+        return seen
+
+
+# Singleton
+_findings_history = None
+
+def get_findings_history():
+    """Obtiene la instancia global del historial de hallazgos"""
+    global _findings_history
+    if _findings_history is None:
+        _findings_history = FindingsHistory()
+    return _findings_history
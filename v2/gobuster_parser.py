@@ -0,0 +1,123 @@
+"""
+gobuster_parser.py - Hallazgos de gobuster (dir, dns, vhost) y dirb línea a línea
+
+La salida se procesa a medida que llega: solo se guarda la línea en curso,
+y el ruido (barra de progreso, banner, colores) se descarta.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+_ANSI = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+
+# gobuster dir: /admin (Status: 301) [Size: 314] [--> http://host/admin/]
+_DIR_LINE = re.compile(
+    r"^(?P<path>\S+)\s+\(Status:\s*(?P<status>\d+)\)"
+    r"(?:\s*\[Size:\s*(?P<size>\d+)\])?"
+    r"(?:\s*\[-->\s*(?P<extra>[^\]]+)\])?"
+)
+# gobuster dns/vhost: Found: dev.example.com [Status: 200] [Size: 1234] | [1.2.3.4]
+_FOUND_LINE = re.compile(
+    r"^Found:\s+(?P<path>\S+)"
+    r"(?:\s+\(?Status:\s*(?P<status>\d+)\)?)?"
+    r"(?:\s*\[Size:\s*(?P<size>\d+)\])?"
+    r"(?:\s*\[(?P<extra>[^\]]+)\])?"
+)
+# dirb: + http://host/index.php (CODE:200|SIZE:1234)  /  ==> DIRECTORY: http://host/admin/
+_DIRB_FILE = re.compile(r"^\+\s+(?P<path>\S+)\s+\(CODE:(?P<status>\d+)\|SIZE:(?P<size>\d+)\)")
+_DIRB_DIRECTORY = re.compile(r"^==>\s+DIRECTORY:\s+(?P<path>\S+)")
+
+_PATTERNS = (_DIR_LINE, _FOUND_LINE, _DIRB_FILE, _DIRB_DIRECTORY)
+
+MAX_ERRORS_KEPT = 5
+
+
+@dataclass(slots=True)
+class Finding:
+    path: str
+    status: Optional[int] = None
+    size: Optional[int] = None
+    extra: str = ""  # redirección (dir) o IPs (dns)
+    
+    def key(self) -> str:
+        """Identidad para deduplicar: el tamaño cambia en páginas dinámicas"""
+        return f"{self.path}|{self.status or ''}"
+    
+    def describe(self) -> str:
+        parts = [self.path]
+        if self.status is not None:
+            parts.append(str(self.status))
+        if self.size is not None:
+            parts.append(f"[{self.size}]")
+        if self.extra:
+            parts.append(f"-> {self.extra}")
+        return " ".join(parts)
+    
+    def to_dict(self) -> Dict:
+        data = {"path": self.path}
+        if self.status is not None:
+            data["status"] = self.status
+        if self.size is not None:
+            data["size"] = self.size
+        if self.extra:
+            data["extra"] = self.extra
+        return data
+
+
+def parse_line(line: str) -> Optional[Finding]:
+    """Hallazgo de una línea de salida (None si es ruido)"""
+    line = _ANSI.sub("", line).strip()
+    if not line:
+        return None
+    for pattern in _PATTERNS:
+        match = pattern.match(line)
+        if match:
+            groups = match.groupdict()
+            return Finding(
+                path=groups["path"],
+                status=int(groups["status"]) if groups.get("status") else None,
+                size=int(groups["size"]) if groups.get("size") else None,
+                extra=(groups.get("extra") or "").strip()
+            )
+    return None
+
+
+class GobusterParser:
+    """
+    Parser incremental: feed() recibe bloques de salida tal como llegan y
+    devuelve los hallazgos de las líneas completas.
+    """
+    
+    def __init__(self):
+        self.lines = 0
+        self.errors: List[str] = []
+        self.error_count = 0
+        self._pending = ""
+    
+    def feed(self, data: str) -> List[Finding]:
+        self._pending += data
+        *lines, self._pending = self._pending.split("\n")
+        return self._parse(lines)
+    
+    def finish(self) -> List[Finding]:
+        """Procesa la última línea si quedó sin salto de línea"""
+        lines, self._pending = [self._pending], ""
+        return self._parse(lines)
+    
+    def _parse(self, lines: List[str]) -> List[Finding]:
+        findings = []
+        for line in lines:
+            # La barra de progreso se reescribe con \r: vale lo último
+            line = line.rsplit("\r", 1)[-1]
+            if not line.strip():
+                continue
+            self.lines += 1
+            finding = parse_line(line)
+            if finding is not None:
+                findings.append(finding)
+            elif line.lstrip().startswith(("[ERROR]", "Error:")):
+                self.error_count += 1
+                if len(self.errors) < MAX_ERRORS_KEPT:
+                    self.errors.append(_ANSI.sub("", line).strip())
+        return findings
@@ -10,10 +10,12 @@ from pathlib import Path
 # Agregar el directorio actual al path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from config import TELEGRAM_BOT_TOKEN, OPENAI_API_KEY
+from config import TELEGRAM_BOT_TOKEN, OPENAI_API_KEY, DISCOVERY_WARM_VERSIONS, DISCOVERY_WATCH
 from telegram_bot import KaliTelegramBot
 from tool_discovery import get_tool_discovery
 from ai_assistant import get_ai_assistant
+from output_capture import prune_spill_dir_periodically
+from results_store import get_results_store
 
 
 def print_banner():
@@ -74,10 +76,13 @@ async def main():
     print("\n1️⃣  Descubriendo herramientas instaladas...")
     discovery = get_tool_discovery()
     print(f"   ✅ {len(discovery.discovered_tools)} herramientas encontradas")
+    if DISCOVERY_WATCH:
+        mode = discovery.start_watching()
+        print(f"   👀 Vigilando directorios de binarios ({mode})")
     
     # Mostrar resumen por categorías
     print("\n   📊 Resumen por categorías:")
-    for category in sorted(discovery.get_all_categories()):
+    for category in discovery.get_all_categories():
         tools = discovery.get_tools_by_category(category)
         cat_name = category.replace("_", " ").title()
         print(f"      • {cat_name}: {len(tools)} herramientas")
@@ -90,6 +95,11 @@ async def main():
     else:
         print("   ⚠️  IA desactivada (sin OpenAI API Key)")
     
+    # Almacén de resultados: carga los escaneos guardados sin bloquear el loop
+    store = await asyncio.to_thread(get_results_store)
+    stats = store.stats()
+    print(f"\n💾 Almacén de resultados: {stats['rows']} puertos de {stats['scans']} escaneos")
+    
     # 3. Iniciar bot de Telegram
     print("\n3️⃣  Iniciando bot de Telegram...")
     bot = KaliTelegramBot()
@@ -112,11 +122,19 @@ async def main():
         # Ejecutar bot
         await bot.run()
         
+        # Volcados de salida (archivos enviados, XML de nmap, salida cruda): se borran al vencer
+        spill_cleanup = asyncio.create_task(prune_spill_dir_periodically())
+        
+        # Las versiones solo se muestran en detalle: resolverlas con el bot ya activo
+        if DISCOVERY_WARM_VERSIONS:
+            discovery.start_version_warmup()
+        
         # Mantener corriendo
         try:
             await asyncio.Event().wait()
         except KeyboardInterrupt:
             print("\n\n👋 Deteniendo KaliBot...")
+            spill_cleanup.cancel()
             await bot.app.stop()
             print("✅ KaliBot detenido correctamente")
     else:
@@ -0,0 +1,303 @@
+"""
+nmap_parser.py - Modelo de resultados de nmap a partir de su salida XML (-oX)
+
+El XML se lee en streaming con iterparse y cada <host> se libera apenas se
+convierte, así que la memoria no depende del tamaño del archivo sino de
+los hosts que quedan en el reporte.
+"""
+
+import io
+import os
+import sys
+import xml.etree.ElementTree as ET
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from config import NMAP_RENDER_HOSTS
+
+
+@dataclass(slots=True)
+class Script:
+    id: str
+    output: str
+
+
+@dataclass(slots=True)
+class Service:
+    name: str = ""
+    product: str = ""
+    version: str = ""
+    extrainfo: str = ""
+    tunnel: str = ""
+    
+    def describe(self) -> str:
+        """Nombre y versión en una línea (ej: "ssh OpenSSH 8.9p1")"""
+        name = f"ssl/{self.name}" if self.tunnel == "ssl" else self.name
+        parts = [name, self.product, self.version]
+        if self.extrainfo:
+            parts.append(f"({self.extrainfo})")
+        return " ".join(p for p in parts if p)
+
+
+@dataclass(slots=True)
+class Port:
+    port: int
+    protocol: str
+    state: str
+    reason: str = ""
+    service: Optional[Service] = None
+    scripts: List[Script] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class OSMatch:
+    name: str
+    accuracy: int
+
+
+@dataclass(slots=True)
+class Host:
+    address: str
+    address_type: str = "ipv4"
+    state: str = "up"
+    mac: str = ""
+    vendor: str = ""
+    hostnames: List[str] = field(default_factory=list)
+    ports: List[Port] = field(default_factory=list)
+    os_matches: List[OSMatch] = field(default_factory=list)
+    scripts: List[Script] = field(default_factory=list)
+    
+    def open_ports(self) -> List[Port]:
+        return [p for p in self.ports if p.state == "open"]
+
+
+def _parse_scripts(elem) -> List[Script]:
+    return [Script(s.get("id", ""), s.get("output", "")) for s in elem.findall("script")]
+
+
+def _parse_host(elem, services: Dict, keep_closed: bool) -> Host:
+    """
+    Convierte un <host>. services comparte un solo objeto Service por
+    combinación distinta (en un barrido se repiten miles de veces).
+    """
+    host = Host(address="")
+    status = elem.find("status")
+    if status is not None:
+        host.state = status.get("state", "unknown")
+    
+    for address in elem.findall("address"):
+        kind = address.get("addrtype", "")
+        if kind == "mac":
+            host.mac = address.get("addr", "")
+            host.vendor = address.get("vendor", "")
+        elif not host.address:
+            host.address = address.get("addr", "")
+            host.address_type = kind
+    
+    hostnames = elem.find("hostnames")
+    if hostnames is not None:
+        host.hostnames = [h.get("name", "") for h in hostnames.findall("hostname")]
+    
+    ports = elem.find("ports")
+    if ports is not None:
+        for port_elem in ports.findall("port"):
+            state = port_elem.find("state")
+            port_state = state.get("state", "") if state is not None else ""
+            # open y open|filtered; cerrados y filtrados solo si se piden
+            if not keep_closed and not port_state.startswith("open"):
+                continue
+            
+            service = None
+            service_elem = port_elem.find("service")
+            if service_elem is not None:
+                fields = tuple(
+                    service_elem.get(name, "")
+                    for name in ("name", "product", "version", "extrainfo", "tunnel")
+                )
+                service = services.get(fields)
+                if service is None:
+                    service = services[fields] = Service(*fields)
+            
+            host.ports.append(Port(
+                port=int(port_elem.get("portid", 0)),
+                protocol=sys.intern(port_elem.get("protocol", "tcp")),
+                state=sys.intern(port_state),
+                reason=sys.intern(state.get("reason", "")) if state is not None else "",
+                service=service,
+                scripts=_parse_scripts(port_elem)
+            ))
+    
+    os_elem = elem.find("os")
+    if os_elem is not None:
+        host.os_matches = [
+            OSMatch(m.get("name", ""), int(m.get("accuracy", 0)))
+            for m in os_elem.findall("osmatch")
+        ]
+    
+    hostscript = elem.find("hostscript")
+    if hostscript is not None:
+        host.scripts = _parse_scripts(hostscript)
+    
+    return host
+
+
+class NmapReport:
+    """
+    Resultado de un escaneo: hosts, puertos, servicios, scripts y SO.
+    Se construye una vez y se resume, filtra y pagina sin volver al XML.
+    """
+    
+    def __init__(self):
+        self.args = ""
+        self.started = None
+        self.finished = None
+        self.elapsed = None
+        self.hosts: List[Host] = []
+        self.hosts_down = 0
+        self.complete = False  # False si el XML estaba cortado (timeout)
+        self.error = ""
+    
+    @classmethod
+    def parse(
+        cls,
+        source: Union[str, bytes, os.PathLike, io.IOBase],
+        keep_down: bool = False,
+        keep_closed: bool = False
+    ) -> "NmapReport":
+        """
+        Lee el XML como str/bytes, una ruta (os.PathLike, ej. Path) o un
+        archivo abierto; un str siempre es el XML, nunca un nombre de archivo.
+        Por defecto solo guarda hosts activos y puertos abiertos.
+        """
+        report = cls()
+        for host in report.iter_hosts(source, keep_closed):
+            if host.state == "up" or keep_down:
+                report.hosts.append(host)
+            if host.state != "up":
+                report.hosts_down += 1
+        return report
+    
+    def iter_hosts(self, source, keep_closed: bool = True) -> Iterator[Host]:
+        """Recorre los hosts del XML en streaming, liberando cada elemento"""
+        services = {}
+        if isinstance(source, str):
+            source = io.BytesIO(source.encode("utf-8"))
+        elif isinstance(source, bytes):
+            source = io.BytesIO(source)
+        elif isinstance(source, os.PathLike):
+            source = os.fspath(source)
+        
+        root = None
+        try:
+            for event, elem in ET.iterparse(source, events=("start", "end")):
+                if event == "start":
+                    if root is None:
+                        root = elem
+                        self.args = elem.get("args", "")
+                        self.started = elem.get("startstr", "")
+                    continue
+                
+                if elem.tag == "host":
+                    yield _parse_host(elem, services, keep_closed)
+                    # Soltar el host ya convertido (y lo anterior bajo la raíz)
+                    elem.clear()
+                    root.clear()
+                elif elem.tag == "finished":
+                    self.finished = elem.get("timestr", "")
+                    self.elapsed = float(elem.get("elapsed", 0) or 0)
+                elif elem.tag == "nmaprun":
+                    self.complete = True
+        except (ET.ParseError, OSError) as e:
+            # Salida cortada o archivo ilegible: se queda con los hosts completos leídos
+            self.error = str(e)
+    
+    # === CONSULTAS ===
+    
+    def open_ports(self) -> Iterator[Tuple[Host, Port]]:
+        for host in self.hosts:
+            for port in host.ports:
+                if port.state == "open":
+                    yield host, port
+    
+    def filter(
+        self,
+        port: Optional[int] = None,
+        service: Optional[str] = None,
+        state: Optional[str] = "open",
+        protocol: Optional[str] = None
+    ) -> List[Tuple[Host, Port]]:
+        """Pares (host, puerto) que cumplen todos los criterios dados"""
+        service = service.lower() if service else None
+        matches = []
+        for host in self.hosts:
+            for entry in host.ports:
+                if port is not None and entry.port != port:
+                    continue
+                if state is not None and entry.state != state:
+                    continue
+                if protocol is not None and entry.protocol != protocol:
+                    continue
+                if service is not None:
+                    name = entry.service.name.lower() if entry.service else ""
+                    if service not in name:
+                        continue
+                matches.append((host, entry))
+        return matches
+    
+    def page(self, page: int = 1, size: int = 20) -> Dict:
+        """Hosts de una página (desde 1) como diccionarios"""
+        start = (max(page, 1) - 1) * size
+        return {
+            "page": max(page, 1),
+            "pages": max((len(self.hosts) + size - 1) // size, 1),
+            "hosts": [asdict(host) for host in self.hosts[start:start + size]]
+        }
+    
+    def summary(self, top: int = 10) -> Dict:
+        """Resumen compacto para la IA y Telegram"""
+        services = Counter()
+        ports = Counter()
+        open_total = 0
+        for _, port in self.open_ports():
+            open_total += 1
+            ports[f"{port.port}/{port.protocol}"] += 1
+            services[port.service.name if port.service and port.service.name else "unknown"] += 1
+        
+        return {
+            "args": self.args,
+            "complete": self.complete,
+            "hosts_up": sum(1 for h in self.hosts if h.state == "up"),
+            "hosts_down": self.hosts_down,
+            "open_ports": open_total,
+            "top_ports": ports.most_common(top),
+            "top_services": services.most_common(top),
+            "elapsed": self.elapsed
+        }
+    
+    def render(self, max_hosts: int = NMAP_RENDER_HOSTS) -> str:
+        """Texto legible con los puertos abiertos de cada host"""
+        summary = self.summary()
+        lines = [
+            f"Nmap: {summary['hosts_up']} hosts activos, {summary['hosts_down']} caídos, "
+            f"{summary['open_ports']} puertos abiertos"
+        ]
+        if not self.complete:
+            lines.append("⚠️ Salida incompleta (escaneo cortado)")
+        
+        for host in self.hosts[:max_hosts]:
+            name = f" ({host.hostnames[0]})" if host.hostnames else ""
+            lines.append(f"\n{host.address}{name}")
+            for port in host.open_ports():
+                service = port.service.describe() if port.service else ""
+                lines.append(f"  {port.port}/{port.protocol} open {service}".rstrip())
+                for script in port.scripts:
+                    first_line = script.output.strip().splitlines()[0] if script.output.strip() else ""
+                    lines.append(f"    | {script.id}: {first_line[:120]}")
+            if host.os_matches:
+                best = host.os_matches[0]
+                lines.append(f"  OS: {best.name} ({best.accuracy}%)")
+        
+        if len(self.hosts) > max_hosts:
+            lines.append(f"\n... y {len(self.hosts) - max_hosts} hosts más")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,136 @@
+"""
+output_capture.py - Captura acotada de la salida de herramientas con volcado a disco
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict
+
+from config import (
+    OUTPUT_HEAD_CHARS,
+    OUTPUT_TAIL_CHARS,
+    OUTPUT_SPILL_THRESHOLD,
+    OUTPUT_SPILL_DIR,
+    OUTPUT_SPILL_MAX_AGE,
+    OUTPUT_SPILL_CLEANUP_INTERVAL
+)
+
+
+class OutputCapture:
+    """
+    Guarda la salida de un stream sin que la memoria crezca con su tamaño.
+    
+    Mientras la salida es pequeña se guarda entera. Al pasar el umbral se
+    vuelca a un archivo temporal y en memoria solo quedan el inicio y la
+    cola (anillo) para mostrarlos al usuario.
+    """
+    
+    def __init__(self, name: str = "stdout"):
+        self.name = name
+        self.total_chars = 0
+        self.path = None
+        self._chunks = []  # salida completa mientras no se vuelque
+        self._buffered = 0
+        self._head = ""
+        self._tail = deque()
+        self._tail_size = 0
+        self._file = None
+    
+    @property
+    def spilled(self) -> bool:
+        return self.path is not None
+    
+    def write(self, data: str):
+        """Agrega un fragmento de salida"""
+        if not data:
+            return
+        self.total_chars += len(data)
+        
+        if self._file is None:
+            self._chunks.append(data)
+            self._buffered += len(data)
+            if self._buffered > OUTPUT_SPILL_THRESHOLD:
+                self._spill()
+            return
+        
+        self._file.write(data)
+        self._push_tail(data)
+    
+    def _spill(self):
+        """Pasa lo acumulado a disco y deja solo inicio y cola en memoria"""
+        Path(OUTPUT_SPILL_DIR).mkdir(parents=True, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(prefix=f"{self.name}_", suffix=".log", dir=OUTPUT_SPILL_DIR)
+        self._file = os.fdopen(fd, "w", encoding="utf-8", errors="ignore")
+        
+        buffered = "".join(self._chunks)
+        self._chunks = []
+        self._buffered = 0
+        self._file.write(buffered)
+        self._head = buffered[:OUTPUT_HEAD_CHARS]
+        self._push_tail(buffered[-OUTPUT_TAIL_CHARS:])
+    
+    def _push_tail(self, data: str):
+        self._tail.append(data)
+        self._tail_size += len(data)
+        while self._tail_size - len(self._tail[0]) >= OUTPUT_TAIL_CHARS:
+            self._tail_size -= len(self._tail.popleft())
+    
+    def close(self):
+        """Cierra el archivo de volcado (si lo hay)"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+    
+    def tail(self, chars: int = OUTPUT_TAIL_CHARS) -> str:
+        """Últimos caracteres capturados (para salida parcial)"""
+        if not self.spilled:
+            return "".join(self._chunks)[-chars:]
+        return "".join(self._tail)[-chars:]
+    
+    def text(self) -> str:
+        """Salida completa si es pequeña; si no, inicio + aviso + cola"""
+        if not self.spilled:
+            return "".join(self._chunks)
+        tail = "".join(self._tail)[-OUTPUT_TAIL_CHARS:]
+        omitted = self.total_chars - len(self._head) - len(tail)
+        return (
+            f"{self._head}\n"
+            f"... [{omitted} caracteres omitidos; salida completa en {self.path}] ...\n"
+            f"{tail}"
+        )
+    
+    def to_result(self) -> Dict:
+        """Campos para el diccionario de resultado de run_command"""
+        self.close()
+        result = {self.name: self.text()}
+        if self.spilled:
+            result[f"{self.name}_file"] = self.path
+            result[f"{self.name}_size"] = os.path.getsize(self.path)
+            result[f"{self.name}_truncated"] = True
+        return result
+
+
+def cleanup_spill_dir(max_age: int = OUTPUT_SPILL_MAX_AGE):
+    """Borra volcados más viejos que max_age segundos"""
+    try:
+        entries = list(os.scandir(OUTPUT_SPILL_DIR))
+    except OSError:
+        return
+    limit = time.time() - max_age
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < limit:
+                os.remove(entry.path)
+        except OSError:
+            continue
+
+
+async def prune_spill_dir_periodically(interval: float = OUTPUT_SPILL_CLEANUP_INTERVAL):
+    """Tarea de fondo: borra los volcados vencidos cada interval segundos"""
+    while True:
+        await asyncio.to_thread(cleanup_spill_dir)
+        await asyncio.sleep(interval)
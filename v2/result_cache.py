@@ -0,0 +1,201 @@
+"""
+result_cache.py - Caché de resultados para herramientas de reconocimiento idempotentes
+"""
+
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+from config import (
+    RESULT_CACHE_MAX_BYTES,
+    RESULT_CACHE_TTLS,
+    RESULT_CACHE_NEGATIVE_TTL,
+    EXPLOITDB_INDEX
+)
+
+# Registro de respuesta de dig: nombre TTL clase tipo datos
+_DIG_RECORD = re.compile(r"^\S+\s+(\d+)\s+IN\s+\S+\s+", re.MULTILINE)
+
+
+def _normalize_value(value):
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, dict):
+        return {k: _normalize_value(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_normalize_value(v) for v in value]
+    return value
+
+
+# Parámetros tipo enumerado: "a" y "A" piden lo mismo
+_CASE_FOLDED = {"record_type": str.upper, "output_format": str.lower}
+
+
+def _fold_case(value, fold):
+    if isinstance(value, str):
+        return fold(value)
+    if isinstance(value, list):
+        return [fold(v) if isinstance(v, str) else v for v in value]
+    return value
+
+
+def parse_bool(value) -> bool:
+    """Booleano de un parámetro de la IA: "false", "no" o "0" como texto son False"""
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "yes", "si", "sí", "1", "on")
+    return bool(value)
+
+
+def _exploitdb_version() -> Optional[float]:
+    """mtime del índice de exploitdb: cambia con cada searchsploit -u"""
+    try:
+        return os.stat(EXPLOITDB_INDEX).st_mtime
+    except OSError:
+        return None
+
+
+def normalize_target(value: str) -> str:
+    """
+    Pasa a minúsculas solo lo que no distingue mayúsculas: el esquema y el
+    host. La ruta de una URL sí las distingue (/Admin no es /admin).
+    """
+    if "://" in value:
+        parts = urlsplit(value)
+        userinfo, at, host = parts.netloc.rpartition("@")
+        return urlunsplit(parts._replace(scheme=parts.scheme.lower(), netloc=userinfo + at + host.lower()))
+    host, slash, path = value.partition("/")
+    return host.lower() + slash + path
+
+
+def make_cache_key(tool_name: str, parameters: Dict) -> str:
+    """Clave normalizada: herramienta + parámetros ordenados (sin espacios sobrantes)"""
+    params = _normalize_value(parameters)
+    for field in ("domain", "target"):
+        # Los nombres de dominio no distinguen mayúsculas
+        if isinstance(params.get(field), str):
+            params[field] = normalize_target(params[field])
+    for field, fold in _CASE_FOLDED.items():
+        if field in params:
+            params[field] = _fold_case(params[field], fold)
+    key = {"tool": tool_name.strip().lower(), "params": params}
+    if key["tool"] == "searchsploit":
+        # Al actualizar exploitdb cambia la clave y lo anterior deja de servir
+        key["exploitdb"] = _exploitdb_version()
+    return json.dumps(key, sort_keys=True, default=str)
+
+
+def dig_ttl(stdout: str) -> Optional[int]:
+    """TTL mínimo de los registros de la respuesta de dig (None si no hay respuesta)"""
+    ttls = [int(ttl) for ttl in _DIG_RECORD.findall(stdout)]
+    return min(ttls) if ttls else None
+
+
+class ResultCache:
+    """
+    Caché LRU de resultados (JSON de execute_tool) acotada en bytes.
+    Cada entrada vence según la política de su herramienta.
+    """
+    
+    def __init__(self, max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # clave -> (vence, guardado, resultado)
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def cacheable(self, tool_name: str) -> bool:
+        return tool_name in RESULT_CACHE_TTLS
+    
+    def get(self, key: str) -> Optional[str]:
+        """Resultado guardado (marcado como "cached") o None si no hay o venció"""
+        entry = self._entries.get(key)
+        now = time.time()
+        if entry is None or entry[0] <= now:
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        data = json.loads(entry[2])
+        data["cached"] = True
+        data["cache_age"] = round(now - entry[1])
+        return json.dumps(data, indent=2)
+    
+    def put(self, key: str, tool_name: str, result: str):
+        """Guarda el resultado si fue exitoso y la política le da un TTL"""
+        ttl = self.ttl_for(tool_name, result)
+        if not ttl:
+            return
+        
+        size = len(result)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        
+        now = time.time()
+        self._entries[key] = (now + ttl, now, result)
+        self.size += size
+        while self.size > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+    
+    def ttl_for(self, tool_name: str, result: str) -> Optional[float]:
+        """Segundos de vida del resultado según la herramienta (None: no guardar)"""
+        if tool_name not in RESULT_CACHE_TTLS:
+            return None
+        try:
+            data = json.loads(result)
+        except ValueError:
+            return None
+        # Errores, timeouts y salidas volcadas a disco no se guardan
+        if not data.get("success") or data.get("returncode") not in (0, None):
+            return None
+        if data.get("stdout_truncated"):
+            return None
+        
+        max_ttl = RESULT_CACHE_TTLS[tool_name]
+        if tool_name == "dig":
+            ttl = dig_ttl(data.get("stdout", ""))
+            return RESULT_CACHE_NEGATIVE_TTL if ttl is None else min(ttl, max_ttl)
+        return max_ttl
+    
+    def invalidate(self, tool_name: Optional[str] = None):
+        """Borra todo o solo lo de una herramienta"""
+        if tool_name is None:
+            self._entries.clear()
+            self.size = 0
+            return
+        for key in [k for k in self._entries if json.loads(k)["tool"] == tool_name.lower()]:
+            self._drop(key)
+    
+    def _drop(self, key: str):
+        entry = self._entries.pop(key)
+        self.size -= len(entry[2])
+    
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+# Singleton
+_result_cache = None
+
+def get_result_cache():
+    """Obtiene la instancia global de la caché de resultados"""
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = ResultCache()
+    return _result_cache
@@ -0,0 +1,374 @@
+"""
+results_store.py - Almacén de resultados de escaneo (host, puerto, servicio)
+
+En memoria los datos van por columnas en arrays compactos (ids de host y
+servicio internados, puertos de 16 bits) con índices por host, puerto y
+servicio. SQLite guarda lo mismo en disco para recuperarlo al arrancar.
+"""
+
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config import RESULTS_DB_PATH
+
+PROTOCOLS = ["tcp", "udp", "sctp"]
+STATES = ["open", "open|filtered", "filtered", "closed", "unfiltered", "closed|filtered"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY,
+    tool TEXT NOT NULL,
+    args TEXT,
+    user_id INTEGER,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS hosts (
+    id INTEGER PRIMARY KEY,
+    address TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS services (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS ports (
+    scan_id INTEGER NOT NULL,
+    host_id INTEGER NOT NULL,
+    port INTEGER NOT NULL,
+    protocol INTEGER NOT NULL,
+    state INTEGER NOT NULL,
+    service_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ports_host ON ports (host_id);
+CREATE INDEX IF NOT EXISTS idx_ports_port ON ports (port);
+CREATE INDEX IF NOT EXISTS idx_ports_service ON ports (service_id);
+"""
+
+
+class _Interner:
+    """Texto <-> id compacto (el id es la posición en la lista)"""
+    
+    def __init__(self):
+        self.values = []
+        self.ids = {}
+    
+    def get_id(self, value: str) -> Optional[int]:
+        return self.ids.get(value)
+    
+    def intern(self, value: str) -> int:
+        value_id = self.ids.get(value)
+        if value_id is None:
+            value_id = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return value_id
+
+
+class ResultsStore:
+    """
+    Filas (escaneo, host, puerto, protocolo, estado, servicio) en columnas.
+    Las consultas recorren solo las filas del índice que corresponde.
+    """
+    
+    def __init__(self, db_path: Optional[str] = RESULTS_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._hosts = _Interner()
+        self._services = _Interner()
+        self._services.intern("")  # id 0: servicio desconocido
+        
+        # Columnas
+        self.scan_ids = array("I")
+        self.host_ids = array("I")
+        self.ports = array("H")
+        self.protocols = array("B")
+        self.states = array("B")
+        self.service_ids = array("I")
+        
+        # Índices: valor -> array de filas
+        self._by_host = {}
+        self._by_port = {}
+        self._by_service = {}
+        
+        self._scan_users = {}  # scan_id -> user_id (quién lanzó cada escaneo)
+        self._db = None
+        self._next_scan_id = 1
+        if db_path:
+            self._open_db()
+    
+    def __len__(self) -> int:
+        return len(self.ports)
+    
+    # === PERSISTENCIA ===
+    
+    def _open_db(self):
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        
+        # Los ids de SQLite se reutilizan como ids internados
+        for host_id, address in self._db.execute("SELECT id, address FROM hosts ORDER BY id"):
+            self._load_interned(self._hosts, host_id, address)
+        for service_id, name in self._db.execute("SELECT id, name FROM services ORDER BY id"):
+            self._load_interned(self._services, service_id, name)
+        
+        cursor = self._db.execute(
+            "SELECT scan_id, host_id, port, protocol, state, service_id FROM ports"
+        )
+        while True:
+            rows = cursor.fetchmany(10000)
+            if not rows:
+                break
+            for row in rows:
+                self._append(*row)
+        
+        for scan_id, user_id in self._db.execute("SELECT id, user_id FROM scans"):
+            self._scan_users[scan_id] = user_id
+        last = self._db.execute("SELECT MAX(id) FROM scans").fetchone()[0]
+        self._next_scan_id = (last or 0) + 1
+    
+    @staticmethod
+    def _load_interned(interner: _Interner, value_id: int, value: str):
+        while len(interner.values) <= value_id:
+            interner.values.append(None)
+        interner.values[value_id] = value
+        interner.ids[value] = value_id
+    
+    def _intern_host(self, address: str) -> int:
+        host_id = self._hosts.get_id(address)
+        if host_id is None:
+            host_id = self._hosts.intern(address)
+            if self._db is not None:
+                self._db.execute("INSERT INTO hosts (id, address) VALUES (?, ?)", (host_id, address))
+        return host_id
+    
+    def _intern_service(self, name: str) -> int:
+        service_id = self._services.get_id(name)
+        if service_id is None:
+            service_id = self._services.intern(name)
+            if self._db is not None:
+                self._db.execute("INSERT INTO services (id, name) VALUES (?, ?)", (service_id, name))
+        return service_id
+    
+    # === CARGA ===
+    
+    def _append(self, scan_id: int, host_id: int, port: int, protocol: int, state: int, service_id: int):
+        row = len(self.ports)
+        self.scan_ids.append(scan_id)
+        self.host_ids.append(host_id)
+        self.ports.append(port)
+        self.protocols.append(protocol)
+        self.states.append(state)
+        self.service_ids.append(service_id)
+        for index, key in ((self._by_host, host_id), (self._by_port, port), (self._by_service, service_id)):
+            rows = index.get(key)
+            if rows is None:
+                rows = index[key] = array("I")
+            rows.append(row)
+    
+    def add_scan(self, tool: str, entries, args: str = "", user_id: Optional[int] = None) -> int:
+        """
+        Guarda un escaneo. entries: iterable de
+        (host, puerto, protocolo, estado, servicio). Devuelve el id del escaneo.
+        """
+        with self._lock:
+            scan_id = self._next_scan_id
+            self._next_scan_id += 1
+            self._scan_users[scan_id] = user_id
+            rows = []
+            for address, port, protocol, state, service in entries:
+                row = (
+                    scan_id,
+                    self._intern_host(address),
+                    int(port),
+                    PROTOCOLS.index(protocol) if protocol in PROTOCOLS else 0,
+                    STATES.index(state) if state in STATES else STATES.index("filtered"),
+                    self._intern_service((service or "").lower())
+                )
+                self._append(*row)
+                rows.append(row)
+            
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT INTO scans (id, tool, args, user_id, created) VALUES (?, ?, ?, ?, ?)",
+                    (scan_id, tool, args, user_id, time.time())
+                )
+                self._db.executemany(
+                    "INSERT INTO ports (scan_id, host_id, port, protocol, state, service_id) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                self._db.commit()
+            return scan_id
+    
+    def add_nmap_report(self, report, user_id: Optional[int] = None) -> int:
+        """Guarda los puertos de un NmapReport (nmap_parser)"""
+        entries = (
+            (host.address, port.port, port.protocol, port.state, port.service.name if port.service else "")
+            for host in report.hosts
+            for port in host.ports
+        )
+        return self.add_scan("nmap", entries, args=report.args, user_id=user_id)
+    
+    # === CONSULTAS ===
+    
+    def _user_scans(self, user_id: Optional[int]) -> Optional[set]:
+        """Escaneos de un usuario (None: sin filtrar por usuario)"""
+        if user_id is None:
+            return None
+        return {scan_id for scan_id, owner in self._scan_users.items() if owner == user_id}
+    
+    def _rows(self, port: Optional[int], service: Optional[str], host: Optional[str]) -> Optional[array]:
+        """Filas del índice más selectivo para los criterios (None: no hay coincidencias)"""
+        candidates = []
+        if port is not None:
+            candidates.append(self._by_port.get(port))
+        if service is not None:
+            service_id = self._services.get_id(service.lower())
+            candidates.append(self._by_service.get(service_id) if service_id is not None else None)
+        if host is not None:
+            host_id = self._hosts.get_id(host)
+            candidates.append(self._by_host.get(host_id) if host_id is not None else None)
+        if not candidates:
+            return array("I", range(len(self.ports)))
+        if any(rows is None for rows in candidates):
+            return None
+        return min(candidates, key=len)
+    
+    def query(
+        self,
+        port: Optional[int] = None,
+        service: Optional[str] = None,
+        host: Optional[str] = None,
+        state: Optional[str] = "open",
+        protocol: Optional[str] = None,
+        scan_id: Optional[int] = None,
+        user_id: Optional[int] = None
+    ) -> List[Dict]:
+        """Filas que cumplen los criterios, sin repetir (host, puerto, protocolo)"""
+        with self._lock:
+            rows = self._rows(port, service, host)
+            if rows is None:
+                return []
+            scans = self._user_scans(user_id)
+            
+            host_id = self._hosts.get_id(host) if host is not None else None
+            service_id = self._services.get_id(service.lower()) if service is not None else None
+            state_id = STATES.index(state) if state in STATES else None
+            protocol_id = PROTOCOLS.index(protocol) if protocol in PROTOCOLS else None
+            
+            seen = set()
+            results = []
+            for row in rows:
+                if port is not None and self.ports[row] != port:
+                    continue
+                if service_id is not None and self.service_ids[row] != service_id:
+                    continue
+                if host_id is not None and self.host_ids[row] != host_id:
+                    continue
+                if state_id is not None and self.states[row] != state_id:
+                    continue
+                if protocol_id is not None and self.protocols[row] != protocol_id:
+                    continue
+                if scan_id is not None and self.scan_ids[row] != scan_id:
+                    continue
+                if scans is not None and self.scan_ids[row] not in scans:
+                    continue
+                key = (self.host_ids[row], self.ports[row], self.protocols[row])
+                if key in seen:
+                    continue
+                seen.add(key)
+                results.append({
+                    "host": self._hosts.values[self.host_ids[row]],
+                    "port": self.ports[row],
+                    "protocol": PROTOCOLS[self.protocols[row]],
+                    "state": STATES[self.states[row]],
+                    "service": self._services.values[self.service_ids[row]],
+                    "scan_id": self.scan_ids[row]
+                })
+            return results
+    
+    def _matching_host_ids(
+        self,
+        port: Optional[int],
+        service: Optional[str],
+        state: str,
+        protocol: Optional[str],
+        user_id: Optional[int] = None
+    ) -> set:
+        """Ids de host que cumplen los criterios (sin armar filas: es el camino rápido)"""
+        rows = self._rows(port, service, None)
+        if rows is None:
+            return set()
+        scans = self._user_scans(user_id)
+        
+        # Variables locales: el bucle corre sobre cientos de miles de filas
+        ports, states, protocols, service_ids, host_ids, scan_ids = (
+            self.ports, self.states, self.protocols, self.service_ids, self.host_ids, self.scan_ids
+        )
+        state_id = STATES.index(state)
+        protocol_id = PROTOCOLS.index(protocol) if protocol in PROTOCOLS else None
+        service_id = self._services.get_id(service.lower()) if service is not None else None
+        
+        return {
+            host_ids[row] for row in rows
+            if states[row] == state_id
+            and (port is None or ports[row] == port)
+            and (protocol_id is None or protocols[row] == protocol_id)
+            and (service_id is None or service_ids[row] == service_id)
+            and (scans is None or scan_ids[row] in scans)
+        }
+    
+    def hosts_with_port(
+        self, port: int, state: str = "open", protocol: str = "tcp", user_id: Optional[int] = None
+    ) -> List[str]:
+        """Hosts con ese puerto en ese estado en cualquier escaneo (del usuario, si se indica)"""
+        with self._lock:
+            found = self._matching_host_ids(port, None, state, protocol, user_id)
+            return sorted(self._hosts.values[host_id] for host_id in found)
+    
+    def hosts_with_service(self, service: str, state: str = "open", user_id: Optional[int] = None) -> List[str]:
+        """Hosts con ese servicio en ese estado en cualquier escaneo (del usuario, si se indica)"""
+        with self._lock:
+            found = self._matching_host_ids(None, service, state, None, user_id)
+            return sorted(self._hosts.values[host_id] for host_id in found)
+    
+    def ports_of_host(self, host: str, state: str = "open", user_id: Optional[int] = None) -> List[Dict]:
+        return sorted(
+            self.query(host=host, state=state, user_id=user_id),
+            key=lambda r: (r["protocol"], r["port"])
+        )
+    
+    def stats(self) -> Dict:
+        return {
+            "rows": len(self.ports),
+            "hosts": len(self._hosts.ids),
+            "services": len(self._services.ids) - 1,
+            "scans": self._next_scan_id - 1
+        }
+    
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+# Singleton (cargar la base lleva segundos: crearlo con asyncio.to_thread al arrancar)
+_results_store = None
+_results_store_lock = threading.Lock()
+
+def get_results_store():
+    """Obtiene la instancia global del almacén de resultados"""
+    global _results_store
+    if _results_store is None:
+        with _results_store_lock:
+            if _results_store is None:
+                try:
+                    _results_store = ResultsStore()
+                except (sqlite3.Error, OSError) as e:
+                    # Base ilegible o ruta sin permisos: el bot sigue, sin persistencia
+                    print(f"⚠️ No se pudo abrir {RESULTS_DB_PATH} ({e}): almacén solo en memoria")
+                    _results_store = ResultsStore(db_path=None)
+    return _results_store
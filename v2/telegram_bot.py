@@ -2,7 +2,10 @@
 telegram_bot.py - Bot de Telegram para Kali Assistant
 """
 
+import asyncio
 import json
+import time
+from collections import deque
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     Application,
@@ -12,11 +15,103 @@ from telegram.ext import (
     ContextTypes,
     filters
 )
+from telegram.error import BadRequest, RetryAfter
 
-from config import TELEGRAM_BOT_TOKEN, ALLOWED_USER_IDS
+from config import (
+    TELEGRAM_BOT_TOKEN,
+    ALLOWED_USER_IDS,
+    LIVE_OUTPUT_ENABLED,
+    LIVE_OUTPUT_INTERVAL,
+    LIVE_OUTPUT_TAIL_CHARS
+)
 from ai_assistant import get_ai_assistant
 from tool_executor import get_tool_executor
 from tool_discovery import get_tool_discovery
+from tool_jobs import get_job_manager, JOB_DONE, JOB_CANCELLED
+from results_store import get_results_store
+
+
+# Límite de Telegram para archivos enviados por bots
+TELEGRAM_MAX_FILE_SIZE = 50 * 1024 * 1024
+
+JOB_STATUS_LABELS = {
+    "queued": "🕒 En cola",
+    "running": "⏳ En ejecución",
+    "done": "✅ Terminado",
+    "failed": "❌ Falló",
+    "cancelled": "🛑 Cancelado"
+}
+
+
+class LiveOutputMessage:
+    """
+    Mensaje de Telegram que se edita con la cola de la salida de una
+    herramienta mientras corre. Las ediciones se limitan a una cada
+    LIVE_OUTPUT_INTERVAL segundos para no chocar con el rate limit.
+    """
+    
+    def __init__(self, message, tool_name: str):
+        self.message = message
+        self.tool_name = tool_name
+        self.tail = deque()
+        self.tail_size = 0
+        self.next_edit = time.monotonic() + LIVE_OUTPUT_INTERVAL
+        self.last_text = None
+        self.edit_task = None
+        self.dirty = False  # hay salida que todavía no se mostró
+    
+    async def on_output(self, event: dict):
+        """Receptor de eventos de ToolExecutor.execute_tool(on_output=...)"""
+        if event["type"] not in ("stdout", "stderr"):
+            return
+        
+        self.tail.append(event["data"])
+        self.tail_size += len(event["data"])
+        while self.tail_size > LIVE_OUTPUT_TAIL_CHARS and len(self.tail) > 1:
+            self.tail_size -= len(self.tail.popleft())
+        
+        # No esperar a Telegram aquí: la edición va en su propia tarea, que
+        # espera el intervalo si hace falta (la salida puede cortarse justo antes)
+        self.dirty = True
+        if self.edit_task is None or self.edit_task.done():
+            self.edit_task = asyncio.create_task(self._flush())
+    
+    async def _flush(self):
+        """Edita apenas lo permite el intervalo, hasta mostrar toda la salida recibida"""
+        while self.dirty:
+            await asyncio.sleep(max(self.next_edit - time.monotonic(), 0))
+            self.dirty = False
+            await self._edit(f"⏳ {self.tool_name} en ejecución...")
+    
+    def _render(self, header: str) -> str:
+        # Un ``` en la salida cerraría el bloque de código
+        output = "".join(self.tail)[-LIVE_OUTPUT_TAIL_CHARS:].replace("```", "'''")
+        if not output.strip():
+            return header
+        return f"{header}\n```\n{output}\n```"
+    
+    async def _edit(self, header: str):
+        text = self._render(header)
+        self.next_edit = time.monotonic() + LIVE_OUTPUT_INTERVAL
+        if text == self.last_text:
+            return
+        try:
+            await self.message.edit_text(text, parse_mode='Markdown')
+            self.last_text = text
+        except RetryAfter as e:
+            self.next_edit = time.monotonic() + e.retry_after
+        except BadRequest:
+            # "message is not modified" o Markdown inválido en la salida
+            pass
+    
+    async def finalize(self, success: bool):
+        """Última edición con el estado final"""
+        if self.edit_task is not None and not self.edit_task.done():
+            # La edición pendiente queda reemplazada por la final
+            self.edit_task.cancel()
+            await asyncio.gather(self.edit_task, return_exceptions=True)
+        status = "✅" if success else "❌"
+        await self._edit(f"{status} {self.tool_name} terminó")
 
 
 class KaliTelegramBot:
@@ -26,7 +121,10 @@ class KaliTelegramBot:
         self.ai = get_ai_assistant()
         self.executor = get_tool_executor()
         self.discovery = get_tool_discovery()
+        self.jobs = get_job_manager()
         self.app = None
+        self._categories_keyboard = None
+        self._categories_keyboard_version = None
         
     def check_authorization(self, user_id: int) -> bool:
         """Verifica si el usuario está autorizado"""
@@ -70,7 +168,9 @@ class KaliTelegramBot:
 
 *Comandos:*
 /tools - Ver herramientas
+/search - Buscar herramientas
 /categories - Ver por categorías
+/jobs - Trabajos en curso
 /status - Estado del sistema
 /help - Ayuda
 /clear - Limpiar contexto
@@ -101,12 +201,48 @@ class KaliTelegramBot:
         
         await update.message.reply_text(message, parse_mode='Markdown')
     
+    async def search_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Busca herramientas por nombre o descripción"""
+        if not self.check_authorization(update.effective_user.id):
+            await update.message.reply_text("❌ No autorizado")
+            return
+        
+        if not context.args:
+            await update.message.reply_text("Uso: /search <término>")
+            return
+        
+        term = " ".join(context.args)
+        results = self.discovery.search_tools(term, limit=25)
+        
+        if not results:
+            await update.message.reply_text(f"🔎 Sin resultados para `{term}`", parse_mode='Markdown')
+            return
+        
+        message = f"🔎 *Resultados para* `{term}`:\n\n"
+        for entry in results:
+            description = entry.get("description") or entry.get("package") or "N/A"
+            message += f"• `{entry['name']}` - {description[:60]}\n"
+        
+        await update.message.reply_text(message, parse_mode='Markdown')
+    
     async def categories_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Muestra herramientas por categorías"""
         if not self.check_authorization(update.effective_user.id):
             await update.message.reply_text("❌ No autorizado")
             return
         
+        reply_markup = self._get_categories_keyboard()
+        await update.message.reply_text(
+            "📂 *Categorías de Herramientas:*\n\nSelecciona una categoría:",
+            reply_markup=reply_markup,
+            parse_mode='Markdown'
+        )
+    
+    def _get_categories_keyboard(self) -> InlineKeyboardMarkup:
+        """Teclado de categorías, regenerado solo si cambiaron las herramientas"""
+        if self._categories_keyboard_version == self.discovery.tools_version:
+            return self._categories_keyboard
+        
         categories = self.discovery.get_all_categories()
         
         keyboard = []
@@ -121,12 +257,9 @@ class KaliTelegramBot:
             
             keyboard.append(row)
         
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await update.message.reply_text(
-            "📂 *Categorías de Herramientas:*\n\nSelecciona una categoría:",
-            reply_markup=reply_markup,
-            parse_mode='Markdown'
-        )
+        self._categories_keyboard = InlineKeyboardMarkup(keyboard)
+        self._categories_keyboard_version = self.discovery.tools_version
+        return self._categories_keyboard
     
     async def category_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Muestra herramientas de una categoría"""
@@ -139,7 +272,7 @@ class KaliTelegramBot:
         cat_name = category.replace("_", " ").title()
         message = f"📂 *{cat_name}* ({len(tools)} herramientas):\n\n"
         
-        for tool in sorted(tools):
+        for tool in tools:
             info = self.discovery.get_tool_info(tool)
             message += f"• `{tool}` - {info.get('description', 'N/A')}\n"
         
@@ -154,6 +287,7 @@ class KaliTelegramBot:
         ai_status = "✅ Activa" if self.ai.is_available() else "❌ Inactiva"
         tools_count = len(self.discovery.discovered_tools)
         context_size = self.ai.get_context_size(update.effective_user.id)
+        scheduler = self.executor.scheduler.status()
         
         status = f"""
 📊 *Estado del Sistema*
@@ -161,6 +295,7 @@ class KaliTelegramBot:
 *IA:* {ai_status}
 *Herramientas instaladas:* {tools_count}
 *Contexto conversacional:* {context_size} mensajes
+*Ejecuciones:* {scheduler['running']} en curso, {scheduler['queued']} en cola ({scheduler['used']}/{scheduler['capacity']} de capacidad)
 
 *Categorías disponibles:*
 """
@@ -206,7 +341,12 @@ Podés hablarme normalmente, parce. Ejemplos:
 
 *Comandos:*
 /tools - Ver herramientas instaladas
+/search <término> - Buscar herramientas
 /categories - Ver por categorías
+/hosts <puerto|servicio> - Hosts encontrados en escaneos
+/jobs - Ver tus trabajos
+/job <id> - Estado y salida parcial de un trabajo
+/cancel <id> - Detener un trabajo
 /status - Estado del sistema
 /clear - Limpiar contexto de IA
 /help - Esta ayuda
@@ -297,35 +437,38 @@ Solo usá estas herramientas en sistemas donde tengas autorización explícita,
                 parse_mode='Markdown'
             )
             
-            # Ejecutar
-            await update.message.reply_text(f"⏳ Ejecutando {tool_name}...")
+            # Ejecutar en segundo plano: el handler no queda esperando
+            progress = await update.message.reply_text(f"⏳ Ejecutando {tool_name}...")
+            live = LiveOutputMessage(progress, tool_name) if LIVE_OUTPUT_ENABLED else None
             
-            try:
-                result = await self.executor.execute_tool(tool_name, parameters)
-                result_data = json.loads(result)
-                
-                if result_data.get("success"):
-                    output = result_data["stdout"]
-                    
-                    # Dividir si es muy largo
-                    if len(output) > 4000:
-                        for i in range(0, len(output), 4000):
-                            await update.message.reply_text(
-                                f"```\n{output[i:i+4000]}\n```",
-                                parse_mode='Markdown'
-                            )
-                    else:
-                        await update.message.reply_text(
-                            f"```\n{output}\n```",
-                            parse_mode='Markdown'
-                        )
-                else:
-                    error = result_data.get("error", "Error desconocido")
-                    await update.message.reply_text(f"❌ Error: {error}")
-                    
-            except Exception as e:
-                await update.message.reply_text(f"❌ Error al ejecutar: {str(e)}")
+            async def on_queue(position: int):
+                text = (
+                    f"🕒 {tool_name} en cola (posición {position})..."
+                    if position else f"⏳ Ejecutando {tool_name}..."
+                )
+                try:
+                    await progress.edit_text(text)
+                except (BadRequest, RetryAfter):
+                    pass
+            
+            async def on_done(job):
+                if live:
+                    await live.finalize(job.status == JOB_DONE)
+                await self._send_tool_result(update, job)
             
+            job = self.jobs.submit(
+                tool_name,
+                parameters,
+                user_id=update.effective_user.id,
+                on_output=live.on_output if live else None,
+                on_queue=on_queue,
+                on_done=on_done
+            )
+            await update.message.reply_text(
+                f"🆔 Trabajo `{job.id}` en segundo plano\n"
+                f"/job {job.id} - ver estado · /cancel {job.id} - detener",
+                parse_mode='Markdown'
+            )
             return
         
         # 5. Error
@@ -345,6 +488,174 @@ Solo usá estas herramientas en sistemas donde tengas autorización explícita,
             "🤔 No entendí esa respuesta. Intenta reformular tu pregunta."
         )
     
+    async def _send_tool_result(self, update: Update, job):
+        """Envía el resultado de un trabajo terminado"""
+        try:
+            result_data = json.loads(job.result)
+            
+            if job.status == JOB_CANCELLED:
+                await update.message.reply_text(f"🛑 Trabajo {job.id} ({job.tool_name}) cancelado")
+            elif result_data.get("success"):
+                output = result_data["stdout"]
+                if result_data.get("cached"):
+                    await update.message.reply_text(
+                        f"♻️ Resultado en caché (hace {result_data.get('cache_age', 0)}s)"
+                    )
+                
+                # Dividir si es muy largo
+                if len(output) > 4000:
+                    for i in range(0, len(output), 4000):
+                        await update.message.reply_text(
+                            f"```\n{output[i:i+4000]}\n```",
+                            parse_mode='Markdown'
+                        )
+                else:
+                    await update.message.reply_text(
+                        f"```\n{output}\n```",
+                        parse_mode='Markdown'
+                    )
+                
+                # Salida volcada a disco: mandar el archivo completo
+                output_file = result_data.get("stdout_file")
+                if output_file and result_data.get("stdout_size", 0) <= TELEGRAM_MAX_FILE_SIZE:
+                    with open(output_file, 'rb') as f:
+                        await update.message.reply_document(
+                            f,
+                            filename=f"{job.tool_name}_output.txt",
+                            caption=f"📄 Salida completa de {job.tool_name}"
+                        )
+            else:
+                error = result_data.get("error", "Error desconocido")
+                await update.message.reply_text(f"❌ Error: {error}")
+                
+                # Timeout: mostrar la salida parcial que alcanzó a salir
+                partial = result_data.get("stdout", "")[-4000:]
+                if result_data.get("timed_out") and partial.strip():
+                    await update.message.reply_text(
+                        f"📄 Salida parcial:\n```\n{partial}\n```",
+                        parse_mode='Markdown'
+                    )
+                
+        except Exception as e:
+            await update.message.reply_text(f"❌ Error al ejecutar: {str(e)}")
+    
+    async def hosts_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Hosts con un puerto o servicio abierto en los escaneos guardados del usuario"""
+        if not self.check_authorization(update.effective_user.id):
+            await update.message.reply_text("❌ No autorizado")
+            return
+        
+        if not context.args:
+            await update.message.reply_text("Uso: /hosts <puerto|servicio> (ej: /hosts 445, /hosts ssh)")
+            return
+        
+        term = context.args[0]
+        user_id = update.effective_user.id
+        # Fuera del loop: la primera llamada puede cargar la base entera
+        store = await asyncio.to_thread(get_results_store)
+        if term.isdigit():
+            hosts = await asyncio.to_thread(store.hosts_with_port, int(term), user_id=user_id)
+            label = f"puerto {term}"
+        else:
+            hosts = await asyncio.to_thread(store.hosts_with_service, term, user_id=user_id)
+            label = f"servicio {term}"
+        
+        if not hosts:
+            await update.message.reply_text(f"🔎 Ningún host con {label} abierto en los escaneos guardados")
+            return
+        
+        message = f"🖥 *Hosts con {label} abierto ({len(hosts)}):*\n\n"
+        message += "\n".join(f"• `{host}`" for host in hosts[:50])
+        if len(hosts) > 50:
+            message += f"\n\n_Y {len(hosts) - 50} más..._"
+        
+        await update.message.reply_text(message, parse_mode='Markdown')
+    
+    # === TRABAJOS ===
+    
+    async def jobs_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Lista los trabajos del usuario"""
+        if not self.check_authorization(update.effective_user.id):
+            await update.message.reply_text("❌ No autorizado")
+            return
+        
+        jobs = self.jobs.list_jobs(update.effective_user.id)[:20]
+        if not jobs:
+            await update.message.reply_text("📭 No tenés trabajos")
+            return
+        
+        message = "🗂 *Tus trabajos:*\n\n"
+        for job in jobs:
+            label = JOB_STATUS_LABELS.get(job.status, job.status)
+            if job.position:
+                label += f" ({job.position})"
+            message += f"• `{job.id}` {job.tool_name} - {label} - {job.elapsed():.0f}s\n"
+        
+        await update.message.reply_text(message, parse_mode='Markdown')
+    
+    def _get_user_job(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Trabajo indicado en /job o /cancel, si es del usuario"""
+        if not context.args:
+            return None
+        job = self.jobs.get(context.args[0])
+        if job is None or job.user_id != update.effective_user.id:
+            return None
+        return job
+    
+    async def job_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Estado y salida parcial de un trabajo"""
+        if not self.check_authorization(update.effective_user.id):
+            await update.message.reply_text("❌ No autorizado")
+            return
+        
+        if not context.args:
+            await update.message.reply_text("Uso: /job <id>")
+            return
+        
+        job = self._get_user_job(update, context)
+        if job is None:
+            await update.message.reply_text("❌ Trabajo no encontrado")
+            return
+        
+        label = JOB_STATUS_LABELS.get(job.status, job.status)
+        if job.position:
+            label += f" (posición {job.position})"
+        
+        message = (
+            f"🆔 *Trabajo* `{job.id}`\n"
+            f"🛠 {job.tool_name}\n"
+            f"📍 {label}\n"
+            f"⏱ {job.elapsed():.0f}s · {job.output_chars} caracteres de salida"
+        )
+        output = job.partial_output().replace("```", "'''")
+        if output.strip():
+            message += f"\n```\n{output}\n```"
+        
+        try:
+            await update.message.reply_text(message, parse_mode='Markdown')
+        except BadRequest:
+            # Markdown inválido en la salida
+            await update.message.reply_text(message)
+    
+    async def cancel_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Cancela un trabajo y mata sus procesos"""
+        if not self.check_authorization(update.effective_user.id):
+            await update.message.reply_text("❌ No autorizado")
+            return
+        
+        if not context.args:
+            await update.message.reply_text("Uso: /cancel <id>")
+            return
+        
+        job = self._get_user_job(update, context)
+        if job is None:
+            await update.message.reply_text("❌ Trabajo no encontrado")
+            return
+        
+        if not await self.jobs.cancel(job.id):
+            label = JOB_STATUS_LABELS.get(job.status, job.status)
+            await update.message.reply_text(f"ℹ️ El trabajo {job.id} ya terminó ({label})")
+    
     async def install_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Maneja la instalación de herramientas"""
         query = update.callback_query
@@ -362,8 +673,8 @@ Solo usá estas herramientas en sistemas donde tengas autorización explícita,
         result = await self.executor.install_tool(tool_name, install_info["install_command"])
         
         if result.get("success"):
-            # Reescanear herramientas
-            self.discovery.scan_installed_tools()
+            # Aplicar solo los binarios que cambiaron (escaneo completo si no hay vigilancia)
+            await self.discovery.refresh()
             await query.message.reply_text(f"✅ {tool_name} instalado correctamente")
         else:
             error = result.get("error", "Error desconocido")
@@ -384,7 +695,12 @@ Solo usá estas herramientas en sistemas donde tengas autorización explícita,
         # Comandos
         self.app.add_handler(CommandHandler("start", self.start_command))
         self.app.add_handler(CommandHandler("tools", self.tools_command))
+        self.app.add_handler(CommandHandler("search", self.search_command))
         self.app.add_handler(CommandHandler("categories", self.categories_command))
+        self.app.add_handler(CommandHandler("hosts", self.hosts_command))
+        self.app.add_handler(CommandHandler("jobs", self.jobs_command))
+        self.app.add_handler(CommandHandler("job", self.job_command))
+        self.app.add_handler(CommandHandler("cancel", self.cancel_command))
         self.app.add_handler(CommandHandler("status", self.status_command))
         self.app.add_handler(CommandHandler("clear", self.clear_command))
         self.app.add_handler(CommandHandler("help", self.help_command))
@@ -0,0 +1,131 @@
+"""
+test_dns_resolver.py - Respuestas mal formadas del resolver nativo
+
+Ejecutar: python -m unittest test_dns_resolver
+"""
+
+import asyncio
+import struct
+import unittest
+
+from dns_resolver import DNSError, DNSResolver, build_query, encode_name, parse_response, RECORD_TYPES
+
+
+def _response(
+    query_id: int, name: str, rtype: str, rdata: bytes, rdlength: int = None, flags: int = 0x8180
+) -> bytes:
+    """Respuesta con una pregunta y un registro (rdlength puede mentir)"""
+    question = build_query(query_id, name, rtype)[12:]
+    header = struct.pack("!HHHHHH", query_id, flags, 1, 1, 0, 0)
+    record = struct.pack(
+        "!HHHIH", 0xC00C, RECORD_TYPES[rtype], 1, 300,
+        len(rdata) if rdlength is None else rdlength
+    )
+    return header + question + record + rdata
+
+
+class ParseResponseTest(unittest.TestCase):
+
+    def test_soa_with_truncated_rdata(self):
+        rdata = encode_name("ns1.example.com") + encode_name("admin.example.com") + b"\x00" * 8
+        with self.assertRaises(DNSError):
+            parse_response(_response(1, "example.com", "SOA", rdata))
+    
+    def test_rdlength_past_end_of_message(self):
+        with self.assertRaises(DNSError):
+            parse_response(_response(1, "example.com", "A", b"\x01\x02", rdlength=4))
+    
+    def test_valid_a_record(self):
+        response = parse_response(_response(1, "example.com", "A", bytes([93, 184, 216, 34])))
+        self.assertEqual(response["answer"][0]["data"], "93.184.216.34")
+
+
+class ResolveManyTest(unittest.TestCase):
+
+    def test_bad_answer_does_not_break_the_batch(self):
+        resolver = DNSResolver(server="127.0.0.1", retries=0)
+        soa = encode_name("ns1.example.com") + encode_name("admin.example.com") + b"\x00" * 8
+        
+        async def fake_udp(packet, query_id, server, port):
+            if b"broken" in packet:
+                return _response(query_id, "broken.example.com", "SOA", soa)
+            return _response(query_id, "ok.example.com", "A", bytes([10, 0, 0, 1]))
+        
+        resolver._query_udp = fake_udp
+        results = asyncio.run(resolver.resolve_many(["broken.example.com", "ok.example.com"], ["A"]))
+        
+        self.assertIn("error", results[0])
+        self.assertEqual(results[1]["answer"][0]["data"], "10.0.0.1")
+
+
+class _StubServer(asyncio.DatagramProtocol):
+    """
+    Servidor DNS de prueba en 127.0.0.1 (UDP y TCP en el mismo puerto):
+    - big.*: truncada por UDP, completa por TCP
+    - drop.*: truncada por UDP, y por TCP cierra antes de responder
+    - wrong.*: contesta un A aunque se pregunte otro tipo
+    """
+    
+    def connection_made(self, transport):
+        self.transport = transport
+    
+    def datagram_received(self, data, addr):
+        query = parse_response(data)
+        name, qtype = query["question"][0]["name"], query["question"][0]["type"]
+        if name.startswith(("big.", "drop.")):
+            reply = _response(query["id"], name, qtype, bytes([10, 0, 0, 9]), flags=0x8380)
+        elif name.startswith("wrong."):
+            reply = _response(query["id"], name, "A", bytes([10, 0, 0, 8]))
+        else:
+            reply = _response(query["id"], name, "A", bytes([10, 0, 0, 1]))
+        self.transport.sendto(reply, addr)
+    
+    @staticmethod
+    async def handle_tcp(reader, writer):
+        size = struct.unpack("!H", await reader.readexactly(2))[0]
+        query = parse_response(await reader.readexactly(size))
+        name = query["question"][0]["name"]
+        if not name.startswith("drop."):
+            reply = _response(query["id"], name, "A", bytes([10, 0, 0, 2]))
+            writer.write(struct.pack("!H", len(reply)) + reply)
+            await writer.drain()
+        writer.close()
+
+
+class StubServerTest(unittest.TestCase):
+
+    def _resolve(self, names, record_types=("A",)):
+        async def scenario():
+            loop = asyncio.get_running_loop()
+            udp, _ = await loop.create_datagram_endpoint(_StubServer, local_addr=("127.0.0.1", 0))
+            port = udp.get_extra_info("sockname")[1]
+            tcp = await asyncio.start_server(_StubServer.handle_tcp, "127.0.0.1", port)
+            resolver = DNSResolver(server="127.0.0.1", port=port, timeout=1, retries=0)
+            try:
+                return await resolver.resolve_many(names, record_types), resolver
+            finally:
+                resolver.close()
+                tcp.close()
+                await tcp.wait_closed()
+                udp.close()
+        
+        return asyncio.run(scenario())
+    
+    def test_truncated_answer_is_repeated_over_tcp(self):
+        (result,), _ = self._resolve(["big.example.com"])
+        self.assertEqual(result["protocol"], "TCP")
+        self.assertEqual(result["answer"][0]["data"], "10.0.0.2")
+    
+    def test_tcp_closed_mid_reply_fails_only_that_entry(self):
+        results, _ = self._resolve(["drop.example.com", "ok.example.com"])
+        self.assertIn("error", results[0])
+        self.assertEqual(results[1]["answer"][0]["data"], "10.0.0.1")
+    
+    def test_mismatched_question_is_rejected_and_not_cached(self):
+        (result,), resolver = self._resolve(["wrong.example.com"], ["MX"])
+        self.assertIn("error", result)
+        self.assertEqual(len(resolver._cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
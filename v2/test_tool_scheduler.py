@@ -0,0 +1,71 @@
+"""
+test_tool_scheduler.py - Orden de arranque del planificador
+
+Ejecutar: python -m unittest test_tool_scheduler
+"""
+
+import asyncio
+import unittest
+
+from tool_scheduler import ToolScheduler
+
+
+class HeavyTicketTest(unittest.TestCase):
+
+    def test_light_jobs_do_not_overtake_a_waiting_heavy_job(self):
+        started = []
+        
+        async def scenario():
+            scheduler = ToolScheduler(capacity=8, max_per_user=2)
+            # 3 nmap (medium, 2 unidades c/u) de usuarios distintos: quedan 2 libres
+            nmaps = [await scheduler.acquire("nmap", user_id=10 + i) for i in range(3)]
+            
+            async def run(tool_name, user_id):
+                ticket = await scheduler.acquire(tool_name, user_id)
+                started.append(tool_name)
+                return ticket
+            
+            # masscan (heavy, 4 unidades) llega antes que una racha de dig (light)
+            masscan = asyncio.create_task(run("masscan", 2))
+            await asyncio.sleep(0)
+            digs = [asyncio.create_task(run("dig", 3)) for _ in range(20)]
+            await asyncio.sleep(0)
+            self.assertEqual(started, [])
+            
+            # Al liberarse un nmap hay 4 unidades: le tocan a masscan
+            scheduler.release(nmaps[0])
+            await asyncio.sleep(0)
+            self.assertEqual(started, ["masscan"])
+            
+            scheduler.release(await masscan)
+            for ticket in nmaps[1:]:
+                scheduler.release(ticket)
+            while len(started) < 21:
+                await asyncio.sleep(0)
+                for task in digs:
+                    if task.done() and not getattr(task, "released", False):
+                        task.released = True
+                        scheduler.release(task.result())
+        
+        asyncio.run(scenario())
+        self.assertEqual(started[0], "masscan")
+        self.assertEqual(started.count("dig"), 20)
+    
+    def test_ticket_waiting_on_its_user_limit_reserves_nothing(self):
+        async def scenario():
+            scheduler = ToolScheduler(capacity=8, max_per_user=2)
+            # Usuario 10 en su límite (2 ejecuciones); 6 unidades en uso
+            await scheduler.acquire("nmap", user_id=10)
+            await scheduler.acquire("nmap", user_id=10)
+            await scheduler.acquire("nmap", user_id=11)
+            waiting = asyncio.create_task(scheduler.acquire("masscan", user_id=10))
+            await asyncio.sleep(0)
+            # masscan espera por el límite de su usuario: dig usa lo libre
+            await asyncio.wait_for(scheduler.acquire("dig", user_id=13), timeout=1)
+            self.assertFalse(waiting.done())
+            waiting.cancel()
+        
+        asyncio.run(scenario())
+
+if __name__ == "__main__":
+    unittest.main()
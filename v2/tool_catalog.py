@@ -0,0 +1,210 @@
+"""
+tool_catalog.py - Catálogo completo de ejecutables con datos de paquetes dpkg
+"""
+
+import os
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional
+
+DPKG_STATUS_PATH = "/var/lib/dpkg/status"
+DPKG_INFO_DIR = "/var/lib/dpkg/info"
+
+
+def parse_dpkg_status(status_path: str = DPKG_STATUS_PATH) -> Dict[str, tuple]:
+    """
+    Lee la base de datos de dpkg en una sola pasada.
+    Devuelve paquete -> (sección, descripción corta) solo para paquetes instalados.
+    """
+    packages = {}
+    fields = {}
+    
+    def flush():
+        name = fields.get("Package")
+        if name and fields.get("Status", "").endswith(" installed"):
+            packages[name] = (fields.get("Section", ""), fields.get("Description", ""))
+        fields.clear()
+    
+    try:
+        with open(status_path, "r", encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                if line == "\n":
+                    flush()
+                    continue
+                # Las líneas de continuación (descripción larga, conffiles) no interesan
+                if line[0] in " \t":
+                    continue
+                key, sep, value = line.partition(":")
+                if sep and key in ("Package", "Status", "Section", "Description"):
+                    fields[key] = value.strip()
+        flush()
+    except OSError:
+        pass
+    
+    return packages
+
+
+class ToolCatalog:
+    """
+    Índice compacto de todos los ejecutables de bin_paths.
+    Los nombres se guardan ordenados y el resto en columnas paralelas
+    (array) que apuntan a tablas de directorios y paquetes.
+    """
+    
+    def __init__(self):
+        self._names = []  # nombres ordenados
+        self._dir_ids = array("H")  # índice en self._dirs
+        self._package_ids = array("i")  # índice en self._packages, -1 si no hay
+        self._dirs = []
+        self._packages = []  # (nombre, sección, descripción)
+        self._search_blob = ""  # nombres en minúscula separados por \n
+        self._blob_offsets = array("I")  # inicio de cada nombre en el blob
+    
+    def __len__(self) -> int:
+        return len(self._names)
+    
+    def __contains__(self, name: str) -> bool:
+        return self._find(name) is not None
+    
+    def build(
+        self,
+        path_index: Dict[str, str],
+        bin_paths: List[str],
+        status_path: str = DPKG_STATUS_PATH,
+        info_dir: str = DPKG_INFO_DIR
+    ) -> "ToolCatalog":
+        """Construye el catálogo a partir del índice nombre -> ruta"""
+        packages = parse_dpkg_status(status_path)
+        owners = self._map_binaries_to_packages(packages, bin_paths, info_dir)
+        
+        dir_ids = {}
+        package_ids = {}
+        names = sorted(path_index)
+        self._names = [sys.intern(name) for name in names]
+        self._dir_ids = array("H")
+        self._package_ids = array("i")
+        self._dirs = []
+        self._packages = []
+        
+        for name in names:
+            directory = os.path.dirname(path_index[name])
+            if directory not in dir_ids:
+                dir_ids[directory] = len(self._dirs)
+                self._dirs.append(directory)
+            self._dir_ids.append(dir_ids[directory])
+            
+            package = owners.get(name)
+            if package is None:
+                self._package_ids.append(-1)
+                continue
+            if package not in package_ids:
+                package_ids[package] = len(self._packages)
+                section, description = packages.get(package, ("", ""))
+                self._packages.append((package, section, description))
+            self._package_ids.append(package_ids[package])
+        
+        offsets = array("I")
+        position = 0
+        for name in names:
+            offsets.append(position)
+            position += len(name) + 1
+        self._blob_offsets = offsets
+        self._search_blob = "\n".join(name.lower() for name in names)
+        return self
+    
+    def _map_binaries_to_packages(self, packages: Dict, bin_paths: List[str], info_dir: str) -> Dict[str, str]:
+        """
+        Recorre los .list de dpkg una vez y se queda solo con las rutas de
+        bin_paths. Evita lanzar dpkg -S por cada binario.
+        """
+        bin_dirs = set()
+        for directory in bin_paths:
+            bin_dirs.add(directory.rstrip("/"))
+            bin_dirs.add(os.path.realpath(directory))
+        
+        owners = {}
+        try:
+            entries = list(os.scandir(info_dir))
+        except OSError:
+            return owners
+        
+        for entry in entries:
+            if not entry.name.endswith(".list"):
+                continue
+            # Paquetes multiarch: "libfoo:amd64.list"
+            package = entry.name[:-5].split(":", 1)[0]
+            if package not in packages:
+                continue
+            try:
+                with open(entry.path, "r", encoding="utf-8", errors="ignore") as f:
+                    for line in f:
+                        directory, _, name = line.rstrip("\n").rpartition("/")
+                        if directory in bin_dirs and name:
+                            owners.setdefault(name, package)
+            except OSError:
+                continue
+        
+        return owners
+    
+    def _find(self, name: str) -> Optional[int]:
+        position = bisect_left(self._names, name)
+        if position < len(self._names) and self._names[position] == name:
+            return position
+        return None
+    
+    def _entry(self, position: int) -> Dict:
+        name = self._names[position]
+        package_id = self._package_ids[position]
+        package, section, description = (None, None, None)
+        if package_id >= 0:
+            package, section, description = self._packages[package_id]
+        return {
+            "name": name,
+            "path": os.path.join(self._dirs[self._dir_ids[position]], name),
+            "package": package,
+            "section": section,
+            "description": description
+        }
+    
+    def get(self, name: str) -> Optional[Dict]:
+        """Información de un ejecutable del catálogo"""
+        position = self._find(name)
+        if position is None:
+            return None
+        return self._entry(position)
+    
+    def search(self, term: str, limit: int = 20) -> List[Dict]:
+        """
+        Busca por nombre (subcadena) y, si faltan resultados, por nombre
+        o descripción del paquete
+        """
+        term = term.lower().strip()
+        if not term:
+            return []
+        
+        found = []
+        seen = set()
+        start = self._search_blob.find(term)
+        while start != -1 and len(found) < limit:
+            position = bisect_right(self._blob_offsets, start) - 1
+            if position not in seen:
+                seen.add(position)
+                found.append(position)
+            # Saltar al siguiente nombre
+            start = self._search_blob.find(term, self._blob_offsets[position] + len(self._names[position]) + 1)
+        
+        if len(found) < limit:
+            matching_packages = {
+                package_id for package_id, (package, _section, description) in enumerate(self._packages)
+                if term in package.lower() or term in description.lower()
+            }
+            if matching_packages:
+                for position, package_id in enumerate(self._package_ids):
+                    if len(found) >= limit:
+                        break
+                    if package_id in matching_packages and position not in seen:
+                        seen.add(position)
+                        found.append(position)
+        
+        return [self._entry(position) for position in found]
@@ -2,24 +2,96 @@
 tool_discovery.py - Descubrimiento automático de herramientas instaladas en Kali
 """
 
+import asyncio
 import os
+import shutil
+import signal
+import stat
 import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from pathlib import Path
 from typing import List, Dict, Optional
 import json
 
+from config import (
+    KALI_BIN_PATHS,
+    DISCOVERY_VERSION_WORKERS,
+    DISCOVERY_VERSION_TIMEOUT,
+    DISCOVERY_SCAN_BUDGET,
+    DISCOVERY_CACHE_PATH,
+    DISCOVERY_CACHE_SAVE_DELAY,
+    DISCOVERY_POLL_INTERVAL,
+    DISCOVERY_FULL_CATALOG,
+    TOOL_MATCH_MIN_CONFIDENCE
+)
+from tool_catalog import ToolCatalog
+from tool_matcher import ToolNameMatcher
+from tool_watcher import BinDirWatcher
+
+# Sube este número si cambia el formato de la caché en disco
+DISCOVERY_CACHE_FORMAT = 1
+
+
+class ToolRecord(dict):
+    """
+    Registro de una herramienta descubierta.
+    Leer "version" nunca sondea: da la versión ya resuelta o None. El
+    sondeo es explícito (resolve_version, en un hilo) o lo hace el warm-up.
+    """
+    
+    def __init__(self, *args, version_resolver=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._version_resolver = version_resolver
+    
+    def __missing__(self, key):
+        if key == "version":
+            return None
+        raise KeyError(key)
+    
+    @property
+    def version_resolved(self) -> bool:
+        """Indica si la versión ya se calculó (sin disparar el sondeo)"""
+        return dict.__contains__(self, "version")
+    
+    def peek_version(self) -> Optional[str]:
+        """Devuelve la versión solo si ya está resuelta"""
+        return dict.get(self, "version")
+    
+    def resolve_version(self) -> str:
+        """Sondea la versión y la guarda en el registro (bloquea: no llamar desde el loop)"""
+        version = self._version_resolver()
+        self["version"] = version
+        return version
+
 class ToolDiscovery:
     """Descubre y cataloga herramientas instaladas en Kali Linux"""
     
     def __init__(self):
-        self.bin_paths = [
-            "/usr/bin",
-            "/usr/sbin", 
-            "/usr/local/bin",
-            "/bin",
-            "/sbin"
-        ]
+        self.bin_paths = list(KALI_BIN_PATHS)
         self.discovered_tools = {}
+        self.tools_version = 0  # sube cada vez que cambian las herramientas descubiertas
+        self._category_index = {}  # categoría -> lista ordenada de herramientas
+        self._categories = []
+        self._path_index = None  # nombre -> ruta del ejecutable
+        self.index_version = 0  # sube cada vez que cambia el índice de ejecutables
+        self._matcher = None
+        self._matcher_version = None
+        self._path_signatures = {}  # nombre -> (size, mtime_ns, inode)
+        self.cache_path = Path(DISCOVERY_CACHE_PATH) if DISCOVERY_CACHE_PATH else None
+        self._tool_signatures = {}  # firmas de las herramientas descubiertas
+        self._warmup_thread = None
+        self._cache_save_timer = None
+        self._cache_save_lock = threading.Lock()
+        self._watcher = None
+        self._index_lock = threading.Lock()
+        self._rescan_lock = asyncio.Lock()
+        self.full_catalog = DISCOVERY_FULL_CATALOG
+        self.catalog = None  # ToolCatalog con todos los ejecutables (modo catálogo completo)
+        self._catalog_dirty = True
+        self._catalog_lock = threading.Lock()
+        self._catalog_rebuilding = False
         self.common_kali_tools = self._load_common_tools()
         
     def _load_common_tools(self) -> Dict:
@@ -106,91 +178,486 @@ class ToolDiscovery:
             "python3": {"category": "utilities", "description": "Python interpreter"},
         }
     
-    def check_tool_installed(self, tool_name: str) -> bool:
-        """Verifica si una herramienta está instalada"""
+    def _build_path_index(self) -> Dict[str, str]:
+        """
+        Lista cada directorio de bin_paths una sola vez y construye el índice
+        nombre -> ruta. Gana el primer directorio, igual que en PATH.
+        """
+        index = {}
+        signatures = {}
+        seen_dirs = set()
+        
+        for directory in self.bin_paths:
+            # En Kali /bin y /sbin suelen ser enlaces a /usr/bin y /usr/sbin
+            real_dir = os.path.realpath(directory)
+            if real_dir in seen_dirs:
+                continue
+            seen_dirs.add(real_dir)
+            
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.name in index:
+                            continue
+                        try:
+                            st = entry.stat()
+                        except OSError:
+                            # Enlace roto o entrada desaparecida
+                            continue
+                        if stat.S_ISREG(st.st_mode) and st.st_mode & 0o111:
+                            index[entry.name] = entry.path
+                            signatures[entry.name] = (st.st_size, st.st_mtime_ns, st.st_ino)
+            except OSError:
+                continue
+        
+        self._path_signatures = signatures
+        return index
+    
+    def refresh_index(self) -> Dict[str, str]:
+        """Reconstruye el índice de ejecutables"""
+        self._path_index = self._build_path_index()
+        self.index_version += 1
+        return self._path_index
+    
+    def _get_signature(self, tool_name: str, path: str) -> Optional[tuple]:
+        """Firma (size, mtime_ns, inode) del binario, usada para invalidar la caché"""
+        signature = self._path_signatures.get(tool_name)
+        if signature is not None:
+            return signature
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_size, st.st_mtime_ns, st.st_ino)
+    
+    def _load_cache(self) -> Dict:
+        """Lee la caché de descubrimiento en disco"""
+        if not self.cache_path:
+            return {}
         try:
-            result = subprocess.run(
-                ["which", tool_name],
-                capture_output=True,
-                text=True,
-                timeout=5
+            with open(self.cache_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        
+        if data.get("format") != DISCOVERY_CACHE_FORMAT or data.get("bin_paths") != self.bin_paths:
+            return {}
+        return data.get("tools", {})
+    
+    def _save_cache(self):
+        """Guarda la caché de forma atómica (tmp + rename)"""
+        if not self.cache_path:
+            return
+        tools = {}
+        for name, record in list(self.discovered_tools.items()):
+            signature = self._tool_signatures.get(name) or (None, None, None)
+            tools[name] = {
+                "path": record["path"],
+                "version": record.peek_version(),
+                "category": record["category"],
+                "size": signature[0],
+                "mtime": signature[1],
+                "inode": signature[2]
+            }
+        data = {
+            "format": DISCOVERY_CACHE_FORMAT,
+            "bin_paths": self.bin_paths,
+            "tools": tools
+        }
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_path.with_name(
+                f"{self.cache_path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
             )
-            return result.returncode == 0
-        except:
-            return False
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"  ⚠️  No se pudo guardar la caché de herramientas: {e}")
+    
+    def _schedule_cache_save(self):
+        """Agrupa las escrituras de la caché: una sola tras DISCOVERY_CACHE_SAVE_DELAY"""
+        with self._cache_save_lock:
+            if self._cache_save_timer is not None:
+                return
+            self._cache_save_timer = threading.Timer(DISCOVERY_CACHE_SAVE_DELAY, self._flush_cache_save)
+            self._cache_save_timer.daemon = True
+            self._cache_save_timer.start()
+    
+    def _flush_cache_save(self):
+        with self._cache_save_lock:
+            self._cache_save_timer = None
+        self._save_cache()
+    
+    def _get_path_index(self) -> Dict[str, str]:
+        """Devuelve el índice, construyéndolo la primera vez"""
+        if self._path_index is None:
+            self.refresh_index()
+        return self._path_index
+    
+    def check_tool_installed(self, tool_name: str) -> bool:
+        """Verifica si una herramienta está instalada"""
+        return self.get_tool_path(tool_name) is not None
     
     def get_tool_path(self, tool_name: str) -> Optional[str]:
         """Obtiene la ruta completa de una herramienta"""
+        path = self._get_path_index().get(tool_name)
+        if path:
+            return path
+        
+        # Fuera de bin_paths (ej. ~/.local/bin): resolver contra PATH sin subprocesos
+        return shutil.which(tool_name)
+    
+    def _run_version_flag(self, command: List[str], timeout: float) -> Optional[str]:
+        """Ejecuta un intento de versión; mata todo el grupo si se cuelga"""
+        process = subprocess.Popen(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            errors="ignore",
+            start_new_session=True
+        )
         try:
-            result = subprocess.run(
-                ["which", tool_name],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.returncode == 0:
-                return result.stdout.strip()
-            return None
-        except:
+            stdout, _ = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            # Herramientas como msfconsole lanzan hijos que heredan el pipe
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except OSError:
+                pass
+            process.communicate()
             return None
+        
+        if process.returncode == 0 and stdout:
+            # Tomar primera línea
+            return stdout.split('\n')[0][:100]
+        return None
+    
+    def resolve_tool_name(self, tool_name: str, min_confidence: Optional[float] = None) -> Optional[Dict]:
+        """
+        Resuelve un nombre propuesto (posible alias o con errores) a un
+        ejecutable instalado sin lanzar procesos.
+        Devuelve {"tool", "confidence", "method"} o None.
+        """
+        if min_confidence is None:
+            min_confidence = TOOL_MATCH_MIN_CONFIDENCE
+        
+        # Rápido y sin construir el índice difuso para el caso habitual
+        path = self.get_tool_path(tool_name)
+        if path:
+            return {"tool": tool_name, "confidence": 1.0, "method": "exact"}
+        
+        index = self._get_path_index()
+        if self._matcher is None or self._matcher_version != self.index_version:
+            self._matcher = ToolNameMatcher(index.keys())
+            self._matcher_version = self.index_version
+        return self._matcher.resolve(tool_name, min_confidence)
     
-    def get_tool_version(self, tool_name: str) -> Optional[str]:
-        """Intenta obtener la versión de una herramienta"""
+    def get_tool_version(self, tool_name: str, deadline: Optional[float] = None) -> Optional[str]:
+        """
+        Intenta obtener la versión de una herramienta.
+        Se detiene en el primer flag que funcione y no empieza intentos
+        nuevos pasado el deadline (time.monotonic()). Si el deadline corta
+        el sondeo devuelve None: la versión queda sin resolver (y fuera de
+        la caché en disco) para sondearla de nuevo más adelante.
+        """
         version_flags = ["--version", "-v", "-V", "version"]
+        executable = self.get_tool_path(tool_name) or tool_name
         
         for flag in version_flags:
+            timeout = DISCOVERY_VERSION_TIMEOUT
+            if deadline is not None:
+                timeout = min(timeout, deadline - time.monotonic())
+                if timeout <= 0:
+                    break
             try:
-                result = subprocess.run(
-                    [tool_name, flag],
-                    capture_output=True,
-                    text=True,
-                    timeout=3
-                )
-                if result.returncode == 0 and result.stdout:
-                    # Tomar primera línea
-                    return result.stdout.split('\n')[0][:100]
-            except:
+                version = self._run_version_flag([executable, flag], timeout)
+            except Exception:
                 continue
+            if version:
+                return version
         
+        if deadline is not None and time.monotonic() >= deadline:
+            return None
         return "Unknown version"
     
-    def scan_installed_tools(self) -> Dict:
-        """Escanea todas las herramientas instaladas"""
+    def probe_versions(self, tool_names: List[str], budget: Optional[float] = None) -> Dict[str, str]:
+        """
+        Obtiene versiones en paralelo con un límite de workers y un
+        presupuesto global de tiempo para todo el escaneo.
+        Las herramientas que no terminan a tiempo (o que el deadline cortó a
+        mitad de sondeo) no aparecen en el resultado.
+        """
+        if budget is None:
+            budget = DISCOVERY_SCAN_BUDGET
+        deadline = time.monotonic() + budget
+        versions = {}
+        if not tool_names:
+            return versions
+        
+        pool = ThreadPoolExecutor(max_workers=max(1, DISCOVERY_VERSION_WORKERS))
+        futures = {
+            pool.submit(self.get_tool_version, name, deadline): name
+            for name in tool_names
+        }
+        try:
+            done, pending = wait(futures, timeout=budget)
+            for future in done:
+                try:
+                    version = future.result()
+                except Exception:
+                    continue
+                if version is not None:
+                    versions[futures[future]] = version
+            if pending:
+                print(f"  ⚠️  Sin versión para {len(pending)} herramientas (presupuesto de {budget}s agotado)")
+        finally:
+            # Los intentos en curso terminan solos: ninguno supera el deadline
+            pool.shutdown(wait=False, cancel_futures=True)
+        
+        return versions
+    
+    def scan_installed_tools(self, use_cache: bool = True) -> Dict:
+        """
+        Escanea todas las herramientas instaladas.
+        Las versiones no se sondean aquí: se toman de la caché si la firma
+        del binario no cambió, o las resuelve después el warm-up o version().
+        """
         print("🔍 Escaneando herramientas instaladas...")
         
         installed = {}
+        signatures = {}
+        stale = 0
+        cached = self._load_cache() if use_cache else {}
+        self.refresh_index()
         
         for tool_name, info in self.common_kali_tools.items():
-            if self.check_tool_installed(tool_name):
-                path = self.get_tool_path(tool_name)
-                version = self.get_tool_version(tool_name)
-                
-                installed[tool_name] = {
-                    "installed": True,
-                    "path": path,
-                    "version": version,
-                    "category": info["category"],
-                    "description": info["description"]
-                }
-                print(f"  ✅ {tool_name}")
+            path = self.get_tool_path(tool_name)
+            if not path:
+                continue
+            
+            signature = self._get_signature(tool_name, path)
+            signatures[tool_name] = signature
+            record = self._make_record(tool_name, path, info)
+            
+            entry = cached.get(tool_name)
+            if (entry and entry.get("path") == path and signature is not None
+                    and (entry.get("size"), entry.get("mtime"), entry.get("inode")) == signature):
+                if entry.get("version") is not None:
+                    record["version"] = entry["version"]
+            elif entry:
+                stale += 1
+            
+            installed[tool_name] = record
+            print(f"  ✅ {tool_name}")
         
-        self.discovered_tools = installed
+        if cached:
+            added = len(set(installed) - set(cached))
+            removed = len(set(cached) - set(installed))
+            print(f"  💾 Caché: {added} nuevas, {removed} eliminadas, {stale} modificadas")
+        
+        self._tool_signatures = signatures
+        self._set_discovered_tools(installed)
+        
+        if self.full_catalog:
+            # Este escaneo ya corre fuera del loop (arranque, rescan, desborde del watcher)
+            catalog = self._build_catalog()
+            print(f"  📚 Catálogo completo: {len(catalog)} ejecutables")
+        self._save_cache()
         print(f"\n✅ Encontradas {len(installed)} herramientas")
         return installed
     
-    def get_tools_by_category(self, category: str) -> List[str]:
-        """Obtiene herramientas por categoría"""
-        return [
-            name for name, info in self.discovered_tools.items()
-            if info.get("category") == category
+    def _make_record(self, tool_name: str, path: str, info: Dict) -> ToolRecord:
+        """Crea el registro de una herramienta con versión perezosa"""
+        return ToolRecord(
+            {
+                "installed": True,
+                "path": path,
+                "category": info["category"],
+                "description": info["description"]
+            },
+            version_resolver=lambda: self._resolve_version(tool_name)
+        )
+    
+    def _resolve_version(self, tool_name: str) -> str:
+        """Sondea la versión de una herramienta a demanda; la caché se escribe más tarde"""
+        version = self.get_tool_version(tool_name)
+        record = self.discovered_tools.get(tool_name)
+        if record is not None:
+            record["version"] = version
+            self._schedule_cache_save()
+        return version
+    
+    def warm_versions(self, budget: Optional[float] = None) -> int:
+        """Resuelve en paralelo las versiones pendientes; devuelve cuántas resolvió"""
+        pending = [
+            name for name, record in self.discovered_tools.items()
+            if not record.version_resolved
         ]
+        if not pending:
+            return 0
+        
+        versions = self.probe_versions(pending, budget)
+        for tool_name, version in versions.items():
+            record = self.discovered_tools.get(tool_name)
+            if record is not None and not record.version_resolved:
+                record["version"] = version
+        self._save_cache()
+        return len(versions)
+    
+    def start_version_warmup(self):
+        """Calienta las versiones en un hilo de fondo (no bloquea al bot)"""
+        if self._warmup_thread and self._warmup_thread.is_alive():
+            return
+        self._warmup_thread = threading.Thread(
+            target=self.warm_versions,
+            name="version-warmup",
+            daemon=True
+        )
+        self._warmup_thread.start()
+    
+    # === API ASÍNCRONA (no bloquea el event loop del bot) ===
+    
+    async def is_installed(self, tool_name: str) -> bool:
+        """Versión async de check_tool_installed"""
+        if self._path_index is None:
+            await asyncio.to_thread(self.refresh_index)
+        return self.check_tool_installed(tool_name)
+    
+    async def resolve(self, tool_name: str, min_confidence: Optional[float] = None) -> Optional[Dict]:
+        """Versión async de resolve_tool_name"""
+        if self._path_index is None or self._matcher_version != self.index_version:
+            # Construir el índice difuso puede tardar unos ms: fuera del loop
+            return await asyncio.to_thread(self.resolve_tool_name, tool_name, min_confidence)
+        return self.resolve_tool_name(tool_name, min_confidence)
+    
+    async def version(self, tool_name: str) -> Optional[str]:
+        """Versión de una herramienta; el sondeo corre en un hilo"""
+        record = self.discovered_tools.get(tool_name)
+        if record is None:
+            return None
+        if record.version_resolved:
+            return record.peek_version()
+        return await asyncio.to_thread(record.resolve_version)
+    
+    async def rescan(self, use_cache: bool = True) -> Dict:
+        """Escaneo completo en un hilo; las llamadas concurrentes se serializan"""
+        async with self._rescan_lock:
+            return await asyncio.to_thread(self.scan_installed_tools, use_cache)
+    
+    async def refresh(self) -> int:
+        """Versión async de sync_changes (ej. después de instalar algo)"""
+        async with self._rescan_lock:
+            return await asyncio.to_thread(self.sync_changes)
+    
+    # === VIGILANCIA INCREMENTAL ===
+    
+    def start_watching(self) -> str:
+        """
+        Vigila los directorios de binarios y actualiza el índice a medida
+        que aparecen o desaparecen ejecutables. Devuelve el modo usado.
+        """
+        if self._watcher is None:
+            self._watcher = BinDirWatcher(
+                self.bin_paths,
+                on_change=self._on_binary_changed,
+                on_overflow=self.scan_installed_tools,
+                poll_interval=DISCOVERY_POLL_INTERVAL
+            )
+        return self._watcher.start()
+    
+    def stop_watching(self):
+        """Detiene la vigilancia de directorios"""
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+    
+    def sync_changes(self) -> int:
+        """
+        Aplica los cambios pendientes en los directorios de binarios.
+        Sin vigilancia activa hace un escaneo completo.
+        """
+        if self._watcher is not None:
+            return self._watcher.process_pending()
+        self.scan_installed_tools()
+        return len(self.discovered_tools)
+    
+    def _lookup_binary(self, tool_name: str):
+        """Busca un nombre en bin_paths en orden; devuelve (ruta, firma) o (None, None)"""
+        for directory in self.bin_paths:
+            path = os.path.join(directory, tool_name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if stat.S_ISREG(st.st_mode) and st.st_mode & 0o111:
+                return path, (st.st_size, st.st_mtime_ns, st.st_ino)
+        return None, None
+    
+    def _on_binary_changed(self, tool_name: str):
+        """Actualiza índice y herramientas descubiertas para un solo nombre"""
+        with self._index_lock:
+            index = self._get_path_index()
+            path, signature = self._lookup_binary(tool_name)
+            if path:
+                index[tool_name] = path
+                self._path_signatures[tool_name] = signature
+            else:
+                index.pop(tool_name, None)
+                self._path_signatures.pop(tool_name, None)
+            self.index_version += 1
+            self._schedule_catalog_rebuild()
+            
+            info = self.common_kali_tools.get(tool_name)
+            if info is None:
+                return
+            
+            current = self.discovered_tools.get(tool_name)
+            if path and current and current["path"] == path \
+                    and self._tool_signatures.get(tool_name) == signature:
+                return
+            
+            # Copiar y reemplazar: los handlers pueden estar iterando el dict actual
+            tools = dict(self.discovered_tools)
+            if path:
+                tools[tool_name] = self._make_record(tool_name, path, info)
+                self._tool_signatures[tool_name] = signature
+                print(f"  ➕ {tool_name} detectada en {path}")
+            elif tool_name in tools:
+                del tools[tool_name]
+                self._tool_signatures.pop(tool_name, None)
+                print(f"  ➖ {tool_name} ya no está instalada")
+            else:
+                return
+            self._set_discovered_tools(tools)
+            self._save_cache()
+    
+    def _set_discovered_tools(self, tools: Dict):
+        """
+        Publica un nuevo conjunto de herramientas y reconstruye el índice por
+        categoría. tools_version permite a otros módulos saber cuándo regenerar
+        lo que derivan de aquí (resumen del prompt, teclados, etc.).
+        """
+        category_index = {}
+        for name, info in tools.items():
+            category_index.setdefault(info.get("category", "unknown"), []).append(name)
+        for names in category_index.values():
+            names.sort()
+        
+        self.discovered_tools = tools
+        self._category_index = category_index
+        self._categories = sorted(category_index)
+        self.tools_version += 1
+    
+    def get_tools_by_category(self, category: str) -> List[str]:
+        """Obtiene herramientas por categoría (lista ordenada, no modificar)"""
+        return self._category_index.get(category, [])
     
     def get_all_categories(self) -> List[str]:
         """Obtiene todas las categorías disponibles"""
-        categories = set()
-        for info in self.discovered_tools.values():
-            categories.add(info.get("category", "unknown"))
-        return sorted(list(categories))
+        return self._categories
     
     def suggest_install(self, tool_name: str) -> Dict:
         """Sugiere cómo instalar una herramienta"""
@@ -228,10 +695,73 @@ class ToolDiscovery:
     
     def export_tools_list(self, filepath: str = "installed_tools.json"):
         """Exporta la lista de herramientas a JSON"""
+        self.warm_versions()
         with open(filepath, 'w') as f:
             json.dump(self.discovered_tools, f, indent=2)
         print(f"✅ Lista exportada a {filepath}")
     
+    def get_catalog(self) -> Optional[ToolCatalog]:
+        """
+        Catálogo de todos los ejecutables de bin_paths enriquecido con dpkg.
+        Solo en modo catálogo completo. Si cambió el índice se reconstruye en
+        un hilo de fondo y mientras tanto se sirve el catálogo anterior.
+        """
+        if not self.full_catalog:
+            return None
+        if self.catalog is None:
+            return self._build_catalog()
+        if self._catalog_dirty:
+            self._schedule_catalog_rebuild()
+        return self.catalog
+    
+    def _build_catalog(self) -> ToolCatalog:
+        """Construye el catálogo en el hilo actual (lee los .list de dpkg)"""
+        with self._catalog_lock:
+            self._catalog_dirty = False
+        with self._index_lock:
+            index = dict(self._get_path_index())
+        self.catalog = ToolCatalog().build(index, self.bin_paths)
+        return self.catalog
+    
+    def _schedule_catalog_rebuild(self):
+        """Marca el catálogo como viejo y lanza (si no corre ya) el hilo que lo reconstruye"""
+        with self._catalog_lock:
+            self._catalog_dirty = True
+            if not self.full_catalog or self.catalog is None or self._catalog_rebuilding:
+                return
+            self._catalog_rebuilding = True
+        threading.Thread(target=self._rebuild_catalog_loop, name="catalog-rebuild", daemon=True).start()
+    
+    def _rebuild_catalog_loop(self):
+        # Una ráfaga de cambios (apt install) se junta en pocas reconstrucciones
+        while True:
+            with self._catalog_lock:
+                if not self._catalog_dirty:
+                    self._catalog_rebuilding = False
+                    return
+            try:
+                self._build_catalog()
+            except Exception as e:
+                print(f"⚠️ Error reconstruyendo el catálogo: {e}")
+                with self._catalog_lock:
+                    self._catalog_rebuilding = False
+                return
+    
+    def search_tools(self, term: str, limit: int = 20) -> List[Dict]:
+        """Busca herramientas por nombre o descripción en el catálogo completo"""
+        catalog = self.get_catalog()
+        if catalog is not None:
+            return catalog.search(term, limit)
+        
+        # Sin catálogo: buscar solo entre las herramientas conocidas
+        term = term.lower()
+        return [
+            {"name": name, "path": info["path"], "package": None,
+             "section": info["category"], "description": info["description"]}
+            for name, info in sorted(self.discovered_tools.items())
+            if term in name.lower() or term in info["description"].lower()
+        ][:limit]
+    
     def get_tool_info(self, tool_name: str) -> Optional[Dict]:
         """Obtiene información completa de una herramienta"""
         if tool_name in self.discovered_tools:
@@ -244,6 +774,18 @@ class ToolDiscovery:
             info["path"] = None
             return info
         
+        # En modo catálogo completo, cualquier ejecutable instalado
+        catalog = self.get_catalog()
+        entry = catalog.get(tool_name) if catalog is not None else None
+        if entry:
+            return {
+                "installed": True,
+                "path": entry["path"],
+                "category": "other",
+                "description": entry["description"] or entry["package"] or "N/A",
+                "package": entry["package"]
+            }
+        
         return None
 
 
@@ -3,10 +3,68 @@ tool_executor.py - Ejecuta herramientas de Kali Linux
 """
 
 import asyncio
+import codecs
+import contextvars
+import os
+import secrets
+import shlex
 import subprocess
-from typing import Dict, Optional
-from config import TOOL_TIMEOUTS, WORDLISTS, ROOT_PASSWORD
-from tool_system import get_system_manager
+import tempfile
+from collections import OrderedDict
+from contextlib import aclosing
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Union
+from config import (
+    TOOL_TIMEOUTS,
+    WORDLISTS,
+    ROOT_PASSWORD,
+    STREAM_CHUNK_SIZE,
+    STREAM_QUEUE_SIZE,
+    RESULT_CACHE_ENABLED,
+    DIG_BACKEND,
+    NMAP_REPORTS_KEPT,
+    FINDINGS_RETURNED,
+    OUTPUT_SPILL_DIR
+)
+from tool_system import get_system_manager, terminate_process
+from output_capture import OutputCapture, cleanup_spill_dir
+from tool_scheduler import get_tool_scheduler
+from result_cache import get_result_cache, make_cache_key, parse_bool
+from dns_resolver import get_dns_resolver, format_dig
+from nmap_parser import NmapReport
+from results_store import get_results_store
+from gobuster_parser import GobusterParser, MAX_ERRORS_KEPT
+from findings_history import get_findings_history
+from web_parsers import parse_nikto, render_nikto, parse_whatweb, render_whatweb
+
+# Un comando es un string para el shell o una lista argv que se lanza con exec
+Command = Union[str, List]
+
+# Receptor de eventos de salida de la tarea actual (ver execute_tool(on_output=...))
+_output_listener: contextvars.ContextVar[Optional[Callable[[Dict], Awaitable[None]]]] = \
+    contextvars.ContextVar("output_listener", default=None)
+# Usuario que lanzó la ejecución actual (los escaneos guardados quedan a su nombre)
+_current_user: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("current_user", default=None)
+
+
+class _Flight:
+    """Una ejecución en curso compartida por todas las llamadas idénticas"""
+    
+    def __init__(self):
+        self.task = None
+        self.listeners = []  # on_output de cada llamada que espera
+        self.queue_listeners = []  # on_queue de cada llamada que espera
+        self.position = None  # última posición en cola avisada (0: ya corre)
+        self.waiters = 0
+    
+    async def fan_out(self, event: Dict):
+        for listener in list(self.listeners):
+            await listener(event)
+    
+    async def fan_out_queue(self, position: int):
+        self.position = position
+        for listener in list(self.queue_listeners):
+            await listener(position)
 
 
 class ToolExecutor:
@@ -15,43 +73,168 @@ class ToolExecutor:
     def __init__(self):
         self.active_processes = {}
         self.system_manager = get_system_manager(ROOT_PASSWORD)
+        self.scheduler = get_tool_scheduler()
+        self.cache = get_result_cache() if RESULT_CACHE_ENABLED else None
+        self._inflight = {}  # (usuario, clave normalizada) -> _Flight
+        self.nmap_reports = OrderedDict()  # report_id -> NmapReport (los últimos)
+        cleanup_spill_dir()
     
-    async def run_command(self, command: str, timeout: int = 300) -> Dict:
-        """Ejecuta un comando del sistema"""
+    async def stream_command(self, command: Command, timeout: int = 300) -> AsyncIterator[Dict]:
+        """
+        Ejecuta un comando y entrega su salida a medida que llega.
+        Una lista argv se lanza directo con exec, sin /bin/sh de por medio.
+        
+        Eventos:
+            - {"type": "stdout" | "stderr", "data": "una o más líneas completas\\n"}
+            - {"type": "exit", "returncode": 0}
+            - {"type": "timeout", "timeout": 300}
+            - {"type": "error", "error": "..."}
+        
+        La cola entre lectores y consumidor es acotada: si el consumidor va
+        lento, el pipe se llena y el proceso espera, así la memoria no crece
+        con el tamaño de la salida.
+        """
         try:
-            process = await asyncio.create_subprocess_shell(
-                command,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            try:
-                stdout, stderr = await asyncio.wait_for(
-                    process.communicate(),
-                    timeout=timeout
+            # Grupo propio: se puede matar con sus hijos
+            if isinstance(command, list):
+                process = await asyncio.create_subprocess_exec(
+                    *[str(arg) for arg in command],
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    start_new_session=True
+                )
+            else:
+                process = await asyncio.create_subprocess_shell(
+                    command,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    start_new_session=True
                 )
-                
-                return {
-                    "success": True,
-                    "command": command,
-                    "stdout": stdout.decode('utf-8', errors='ignore'),
-                    "stderr": stderr.decode('utf-8', errors='ignore'),
-                    "returncode": process.returncode
-                }
-            except asyncio.TimeoutError:
-                process.kill()
-                return {
-                    "success": False,
-                    "command": command,
-                    "error": f"Comando excedió el timeout de {timeout} segundos"
-                }
-                
         except Exception as e:
-            return {
-                "success": False,
-                "command": command,
-                "error": str(e)
-            }
+            yield {"type": "error", "error": str(e)}
+            return
+        
+        queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        readers = [
+            asyncio.create_task(self._pump_stream(process.stdout, "stdout", queue)),
+            asyncio.create_task(self._pump_stream(process.stderr, "stderr", queue))
+        ]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        open_streams = len(readers)
+        
+        try:
+            while open_streams:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                event = await asyncio.wait_for(queue.get(), timeout=remaining)
+                if event is None:
+                    open_streams -= 1
+                    continue
+                yield event
+            
+            remaining = max(deadline - loop.time(), 0)
+            returncode = await asyncio.wait_for(process.wait(), timeout=remaining)
+            yield {"type": "exit", "returncode": returncode}
+        except asyncio.TimeoutError:
+            # Cortar antes de avisar: el consumidor puede no seguir iterando
+            await self._cleanup_process(process, readers)
+            yield {"type": "timeout", "timeout": timeout}
+        finally:
+            # También se llega aquí si el consumidor abandona el iterador
+            # o si se cancela la tarea (p. ej. /cancel de un trabajo)
+            await self._cleanup_process(process, readers)
+    
+    async def _cleanup_process(self, process, readers):
+        """Termina el grupo de procesos (shell, nmap, sudo, tuberías), lo reapea y suelta los pipes"""
+        for reader in readers:
+            reader.cancel()
+        await asyncio.gather(*readers, return_exceptions=True)
+        await terminate_process(process)
+    
+    async def _pump_stream(self, stream: asyncio.StreamReader, name: str, queue: asyncio.Queue):
+        """Lee un pipe por bloques y entrega solo líneas completas (o fragmentos de STREAM_CHUNK_SIZE)"""
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+        pending = ""
+        try:
+            while True:
+                chunk = await stream.read(STREAM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                pending += decoder.decode(chunk)
+                # Un evento por bloque con todas las líneas completas que trajo
+                cut = pending.rfind('\n') + 1
+                if cut:
+                    await queue.put({"type": name, "data": pending[:cut]})
+                    pending = pending[cut:]
+                # Línea sin fin demasiado larga: entregarla como fragmento
+                if len(pending) >= STREAM_CHUNK_SIZE:
+                    await queue.put({"type": name, "data": pending})
+                    pending = ""
+            
+            pending += decoder.decode(b"", final=True)
+            if pending:
+                await queue.put({"type": name, "data": pending})
+        except (OSError, ValueError):
+            pass
+        
+        # Fin de este pipe
+        await queue.put(None)
+    
+    async def run_command(self, command: Command, timeout: int = 300) -> Dict:
+        """
+        Ejecuta un comando del sistema (string para el shell o lista argv).
+        Las salidas grandes se vuelcan a disco: el resultado lleva inicio y
+        cola en "stdout"/"stderr" y la ruta completa en "stdout_file"/"stderr_file".
+        """
+        argv = command if isinstance(command, list) else None
+        if argv is not None:
+            command = shlex.join(str(arg) for arg in argv)
+        
+        listener = _output_listener.get()
+        captures = {
+            "stdout": OutputCapture("stdout"),
+            "stderr": OutputCapture("stderr")
+        }
+        returncode = None
+        
+        try:
+            async with aclosing(self.stream_command(argv or command, timeout)) as events:
+                async for event in events:
+                    if listener is not None:
+                        await listener(event)
+                    
+                    if event["type"] in captures:
+                        captures[event["type"]].write(event["data"])
+                    elif event["type"] == "exit":
+                        returncode = event["returncode"]
+                    elif event["type"] == "timeout":
+                        # Devolver lo que alcanzó a salir antes del corte
+                        result = {
+                            "success": False,
+                            "command": command,
+                            "error": f"Comando excedió el timeout de {timeout} segundos",
+                            "timed_out": True
+                        }
+                        result.update(captures["stdout"].to_result())
+                        result.update(captures["stderr"].to_result())
+                        return result
+                    elif event["type"] == "error":
+                        return {
+                            "success": False,
+                            "command": command,
+                            "error": event["error"]
+                        }
+        finally:
+            for capture in captures.values():
+                capture.close()
+        
+        result = {"success": True, "command": command}
+        result.update(captures["stdout"].to_result())
+        result.update(captures["stderr"].to_result())
+        result["returncode"] = returncode
+        return result
     
     async def install_tool(self, tool_name: str, install_command: str) -> Dict:
         """Instala una herramienta"""
@@ -78,39 +261,90 @@ class ToolExecutor:
         target = params["target"]
         ports = params.get("ports", "1-1000")
         scan_type = params.get("scan_type", "basic")
-        output_format = params.get("output_format", "normal")
+        output_format = params.get("output_format", "normal").lower()
         
         scan_options = {
-            "quick": "-F",
-            "basic": f"-p {ports}",
-            "version": f"-sV -p {ports}",
-            "aggressive": f"-A -p {ports}",
-            "stealth": f"-sS -p {ports}",
-            "udp": f"-sU -p {ports}"
+            "quick": ["-F"],
+            "basic": ["-p", ports],
+            "version": ["-sV", "-p", ports],
+            "aggressive": ["-A", "-p", ports],
+            "stealth": ["-sS", "-p", ports],
+            "udp": ["-sU", "-p", ports]
         }
         
-        verbose = "-v" if output_format == "verbose" else ""
-        xml = "-oX -" if output_format == "xml" else ""
+        argv = ["nmap", *scan_options[scan_type]]
+        if output_format == "verbose":
+            argv.append("-v")
+        if output_format == "xml":
+            argv += ["-oX", "-"]
+        argv += target.split()  # varios objetivos separados por espacios
         
-        command = f"nmap {scan_options[scan_type]} {verbose} {xml} {target}"
-        result = await self.run_command(command, timeout=TOOL_TIMEOUTS.get("nmap", 600))
+        result = await self.run_command(argv, timeout=TOOL_TIMEOUTS.get("nmap", 600))
+        
+        if output_format == "xml" and result.get("stdout"):
+            await self._attach_nmap_report(result)
         
         return self._format_result(result)
     
+    async def _attach_nmap_report(self, result: Dict):
+        """
+        Parsea el XML de nmap (del volcado a disco si lo hubo) y reemplaza
+        stdout por un resumen legible. El reporte queda en memoria para
+        filtrarlo y paginarlo con get_nmap_report(report_id), y sus puertos
+        se guardan en el almacén de resultados.
+        """
+        if result.get("stdout_file"):
+            source = Path(result["stdout_file"])
+        else:
+            source = result["stdout"]
+        report = await asyncio.to_thread(NmapReport.parse, source)
+        if not report.hosts and not report.complete:
+            # No era XML de nmap (o vino vacío): dejar la salida como está
+            return
+        
+        report_id = secrets.token_hex(4)
+        self.nmap_reports[report_id] = report
+        while len(self.nmap_reports) > NMAP_REPORTS_KEPT:
+            self.nmap_reports.popitem(last=False)
+        
+        result["report_id"] = report_id
+        try:
+            store = await asyncio.to_thread(get_results_store)
+            result["scan_id"] = await asyncio.to_thread(store.add_nmap_report, report, _current_user.get())
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar el escaneo en el almacén: {e}")
+        result["nmap"] = report.summary()
+        result["stdout"] = report.render()
+    
+    def get_nmap_report(self, report_id: str) -> Optional[NmapReport]:
+        """Reporte de nmap parseado en una ejecución reciente"""
+        return self.nmap_reports.get(report_id)
+    
     async def execute_nikto(self, params: Dict) -> str:
         """Ejecuta nikto"""
         target = params["target"]
-        ssl = "-ssl" if params.get("ssl", False) else ""
         port = params.get("port", 80)
         tuning = params.get("tuning", "1234")
         
-        command = f"nikto -h {target} -p {port} {ssl} -Tuning {tuning}"
-        result = await self.run_command(command, timeout=TOOL_TIMEOUTS.get("nikto", 600))
+        argv = ["nikto", "-h", target, "-p", port]
+        if params.get("ssl", False):
+            argv.append("-ssl")
+        argv += ["-Tuning", tuning]
+        
+        report_path = self._report_path("nikto")
+        argv += ["-Format", "json", "-o", report_path]
+        
+        result = await self.run_command(argv, timeout=TOOL_TIMEOUTS.get("nikto", 600))
+        
+        hosts = await self._load_report(report_path, parse_nikto)
+        if hosts:
+            result["nikto"] = hosts
+            result["stdout"] = render_nikto(hosts)
         
         return self._format_result(result)
     
     async def execute_gobuster(self, params: Dict) -> str:
-        """Ejecuta gobuster"""
+        """Ejecuta gobuster (devuelve solo los hallazgos nuevos para el objetivo)"""
         mode = params.get("mode", "dir")
         target = params["target"]
         wordlist = params.get("wordlist", "common")
@@ -120,15 +354,121 @@ class ToolExecutor:
         
         if mode == "dir":
             extensions = params.get("extensions", "php,html,txt")
-            command = f"gobuster dir -u {target} -w {wl_path} -x {extensions} -t {threads}"
+            argv = ["gobuster", "dir", "-u", target, "-w", wl_path, "-x", extensions]
         elif mode == "dns":
-            command = f"gobuster dns -d {target} -w {wl_path} -t {threads}"
+            argv = ["gobuster", "dns", "-d", target, "-w", wl_path]
         elif mode == "vhost":
-            command = f"gobuster vhost -u {target} -w {wl_path} -t {threads}"
+            argv = ["gobuster", "vhost", "-u", target, "-w", wl_path]
+        # Sin banner ni barra de progreso
+        argv += ["-t", threads, "-q", "-z"]
+        
+        result = await self._run_bruteforce(
+            "gobuster", mode, target, argv,
+            timeout=TOOL_TIMEOUTS.get("gobuster", 600),
+            all_findings=params.get("all_findings", False)
+        )
+        return self._format_result(result)
+    
+    async def execute_dirb(self, params: Dict) -> str:
+        """Ejecuta dirb (devuelve solo los hallazgos nuevos para el objetivo)"""
+        target = params["target"]
+        wordlist = params.get("wordlist", "common")
         
-        result = await self.run_command(command, timeout=TOOL_TIMEOUTS.get("gobuster", 600))
+        # -S: no mostrar cada palabra probada
+        argv = ["dirb", target, WORDLISTS.get(wordlist, wordlist), "-S"]
+        
+        result = await self._run_bruteforce(
+            "dirb", "dir", target, argv,
+            timeout=TOOL_TIMEOUTS.get("dirb", 600),
+            all_findings=params.get("all_findings", False)
+        )
         return self._format_result(result)
     
+    async def _run_bruteforce(
+        self,
+        tool_name: str,
+        mode: str,
+        target: str,
+        argv: List,
+        timeout: int,
+        all_findings: bool = False
+    ) -> Dict:
+        """
+        Ejecuta gobuster/dirb parseando la salida mientras llega. Los
+        hallazgos ya reportados en corridas anteriores contra el mismo
+        objetivo se descartan (salvo all_findings), y a quien escucha la
+        salida en vivo solo le llegan las líneas de hallazgos nuevos.
+        
+        Solo se marcan como reportados los hallazgos que van en el resultado
+        y solo si la corrida terminó bien: los que quedan fuera del tope, o
+        los de una corrida cortada o cancelada, vuelven a salir la próxima vez.
+        """
+        parser = GobusterParser()
+        error_parser = GobusterParser()  # gobuster escribe los errores en stderr
+        seen = get_findings_history().seen(tool_name, mode, target)
+        new_findings = []
+        run_keys = set()  # para no repetir dentro de la misma corrida
+        counts = {"total": 0, "new": 0}
+        listener = _output_listener.get()
+        
+        def record(findings) -> List:
+            fresh = []
+            for finding in findings:
+                counts["total"] += 1
+                key = finding.key()
+                if key in run_keys or (key in seen and not all_findings):
+                    continue
+                run_keys.add(key)
+                counts["new"] += 1
+                fresh.append(finding)
+            if len(new_findings) < FINDINGS_RETURNED:
+                new_findings.extend(fresh[:FINDINGS_RETURNED - len(new_findings)])
+            return fresh
+        
+        async def collect(event: Dict):
+            if event["type"] == "stdout":
+                fresh = record(parser.feed(event["data"]))
+                if not fresh:
+                    return
+                event = {"type": "stdout", "data": "".join(f"{f.describe()}\n" for f in fresh)}
+            elif event["type"] == "stderr":
+                error_parser.feed(event["data"])
+            if listener is not None:
+                await listener(event)
+        
+        token = _output_listener.set(collect)
+        try:
+            result = await self.run_command(argv, timeout=timeout)
+        finally:
+            _output_listener.reset(token)
+        record(parser.finish())
+        
+        if result.get("success") and result.get("returncode") == 0:
+            for finding in new_findings:
+                seen.add(finding.key())
+            seen.save()
+        
+        # La salida cruda queda en disco si se volcó, pero no se envía
+        if "stdout_file" in result:
+            result["raw_output_file"] = result.pop("stdout_file")
+            result.pop("stdout_size", None)
+        
+        result["findings_total"] = counts["total"]
+        result["findings_new"] = counts["new"]
+        result["findings"] = [f.to_dict() for f in new_findings]
+        error_parser.finish()
+        errors = (parser.errors + error_parser.errors)[:MAX_ERRORS_KEPT]
+        if errors:
+            result["errors"] = errors
+            result["error_count"] = parser.error_count + error_parser.error_count
+        
+        lines = [f"{tool_name}: {counts['new']} hallazgos nuevos de {counts['total']} ({target})"]
+        lines += [f.describe() for f in new_findings]
+        if counts["new"] > len(new_findings):
+            lines.append(f"... y {counts['new'] - len(new_findings)} más")
+        result["stdout"] = "\n".join(lines) + "\n"
+        return result
+    
     async def execute_sqlmap(self, params: Dict) -> str:
         """Ejecuta sqlmap"""
         url = params["url"]
@@ -138,27 +478,59 @@ class ToolExecutor:
         data = params.get("data")
         cookie = params.get("cookie")
         
-        command = f"sqlmap -u '{url}' --batch --level={level} --risk={risk} --technique={technique}"
+        argv = [
+            "sqlmap", "-u", url, "--batch",
+            f"--level={level}", f"--risk={risk}", f"--technique={technique}"
+        ]
         
         if data:
-            command += f" --data='{data}'"
+            argv.append(f"--data={data}")
         if cookie:
-            command += f" --cookie='{cookie}'"
+            argv.append(f"--cookie={cookie}")
         
-        result = await self.run_command(command, timeout=TOOL_TIMEOUTS.get("sqlmap", 600))
+        result = await self.run_command(argv, timeout=TOOL_TIMEOUTS.get("sqlmap", 600))
         return self._format_result(result)
     
     async def execute_whatweb(self, params: Dict) -> str:
         """Ejecuta whatweb"""
         target = params["target"]
         aggression = params.get("aggression", 1)
-        verbose = "-v" if params.get("verbose", True) else ""
         
-        command = f"whatweb -a {aggression} {verbose} {target}"
-        result = await self.run_command(command, timeout=TOOL_TIMEOUTS.get("whatweb", 120))
+        verbose = params.get("verbose", False)
+        report_path = self._report_path("whatweb")
+        
+        argv = ["whatweb", "-a", aggression, "--color=never", f"--log-json={report_path}"]
+        if verbose:
+            argv.append("-v")
+        argv.append(target)
+        
+        result = await self.run_command(argv, timeout=TOOL_TIMEOUTS.get("whatweb", 120))
+        
+        targets = await self._load_report(report_path, parse_whatweb)
+        if targets:
+            result["whatweb"] = targets
+            # Con verbose se conserva el texto completo de whatweb
+            if not verbose:
+                result["stdout"] = render_whatweb(targets)
         
         return self._format_result(result)
     
+    def _report_path(self, tool_name: str) -> str:
+        """Archivo temporal para la salida en formato de máquina de una herramienta"""
+        Path(OUTPUT_SPILL_DIR).mkdir(parents=True, exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix=f"{tool_name}_", suffix=".json", dir=OUTPUT_SPILL_DIR)
+        os.close(fd)
+        return path
+    
+    async def _load_report(self, path: str, parse):
+        """Parsea el reporte que dejó la herramienta y borra el archivo"""
+        try:
+            return await asyncio.to_thread(parse, Path(path))
+        except OSError:
+            return None
+        finally:
+            Path(path).unlink(missing_ok=True)
+    
     async def execute_hydra(self, params: Dict) -> str:
         """Ejecuta hydra"""
         target = params["target"]
@@ -168,30 +540,79 @@ class ToolExecutor:
         threads = params.get("threads", 4)
         port = params.get("port")
         
-        port_flag = f"-s {port}" if port else ""
+        argv = ["hydra", "-l", username, "-P", password_list, "-t", threads]
+        if port:
+            argv += ["-s", port]
+        argv += [target, service]
         
-        command = f"hydra -l {username} -P {password_list} -t {threads} {port_flag} {target} {service}"
-        result = await self.run_command(command, timeout=TOOL_TIMEOUTS.get("hydra", 1800))
+        result = await self.run_command(argv, timeout=TOOL_TIMEOUTS.get("hydra", 1800))
         
         return self._format_result(result)
     
     async def execute_dig(self, params: Dict) -> str:
-        """Ejecuta dig"""
+        """Ejecuta dig (binario o resolver nativo según DIG_BACKEND)"""
+        if params.get("backend", DIG_BACKEND) == "native":
+            return await self._execute_dig_native(params)
+        
         domain = params["domain"]
-        record_type = params.get("record_type", "A")
+        record_type = params.get("record_type", "A").upper()
         dns_server = params.get("dns_server", "")
         
-        command = f"dig {domain} {record_type} {dns_server if dns_server else ''}"
-        result = await self.run_command(command, timeout=TOOL_TIMEOUTS.get("dig", 30))
+        argv = ["dig", domain, record_type]
+        if dns_server:
+            argv.append(dns_server if dns_server.startswith("@") else f"@{dns_server}")
+        
+        result = await self.run_command(argv, timeout=TOOL_TIMEOUTS.get("dig", 30))
         
         return self._format_result(result)
     
+    async def _execute_dig_native(self, params: Dict) -> str:
+        """
+        Consultas DNS en proceso. domain y record_type aceptan listas (o valores
+        separados por comas) y se resuelven todas las combinaciones en lote.
+        """
+        def as_list(value) -> List[str]:
+            if isinstance(value, str):
+                value = value.replace(",", " ").split()
+            return [str(v) for v in value]
+        
+        domains = as_list(params["domain"])
+        record_types = [t.upper() for t in as_list(params.get("record_type", "A"))]
+        dns_server = params.get("dns_server") or None
+        
+        responses = await get_dns_resolver().resolve_many(domains, record_types, server=dns_server)
+        
+        stdout = ""
+        records = []
+        errors = []
+        for response in responses:
+            if "error" in response:
+                errors.append(response["error"])
+                continue
+            stdout += format_dig(response) + "\n"
+            records += [
+                {"name": r["name"], "type": r["type"], "ttl": r["ttl"], "data": r["data"]}
+                for r in response["answer"]
+            ]
+        
+        result = {
+            "success": bool(records) or not errors,
+            "command": f"dig {' '.join(domains)} {' '.join(record_types)}"
+                       + (f" @{dns_server.lstrip('@')}" if dns_server else "") + " (nativo)",
+            "stdout": stdout,
+            "stderr": "\n".join(errors),
+            "records": records,
+            "returncode": 0 if not errors else 9
+        }
+        if not responses or len(errors) == len(responses):
+            result["error"] = errors[0] if errors else "Sin consultas"
+        return self._format_result(result)
+    
     async def execute_whois(self, params: Dict) -> str:
         """Ejecuta whois"""
         target = params["target"]
         
-        command = f"whois {target}"
-        result = await self.run_command(command, timeout=TOOL_TIMEOUTS.get("whois", 30))
+        result = await self.run_command(["whois", target], timeout=TOOL_TIMEOUTS.get("whois", 30))
         
         return self._format_result(result)
     
@@ -204,26 +625,26 @@ class ToolExecutor:
         output_file = params.get("output", "payload.apk")
         
         # Construir comando base
-        command = f"msfvenom -p {payload_type} LHOST={lhost} LPORT={lport}"
+        argv = ["msfvenom", "-p", payload_type, f"LHOST={lhost}", f"LPORT={lport}"]
         
         # Agregar formato si no es raw
         if output_format != "raw":
-            command += f" -f {output_format}"
+            argv += ["-f", output_format]
         
         # Agregar archivo de salida
-        command += f" -o {output_file}"
+        argv += ["-o", output_file]
         
         # Opciones adicionales
         if "arch" in params:
-            command += f" --arch {params['arch']}"
+            argv += ["--arch", params["arch"]]
         if "platform" in params:
-            command += f" --platform {params['platform']}"
+            argv += ["--platform", params["platform"]]
         if "encoder" in params:
-            command += f" -e {params['encoder']}"
+            argv += ["-e", params["encoder"]]
         if "iterations" in params:
-            command += f" -i {params['iterations']}"
+            argv += ["-i", params["iterations"]]
         
-        result = await self.run_command(command, timeout=TOOL_TIMEOUTS.get("msfvenom", 120))
+        result = await self.run_command(argv, timeout=TOOL_TIMEOUTS.get("msfvenom", 120))
         
         # Verificar si el archivo se creó
         if result.get("success") and output_file:
@@ -288,13 +709,126 @@ class ToolExecutor:
         )
         return self.system_manager.format_result(result)
     
-    async def execute_tool(self, tool_name: str, parameters: Dict) -> str:
-        """Ejecuta cualquier herramienta por nombre"""
+    async def execute_tool(
+        self,
+        tool_name: str,
+        parameters: Dict,
+        on_output: Optional[Callable[[Dict], Awaitable[None]]] = None,
+        user_id: Optional[int] = None,
+        on_queue: Optional[Callable[[int], Awaitable[None]]] = None,
+        use_cache: bool = True
+    ) -> str:
+        """
+        Ejecuta cualquier herramienta por nombre.
+        Si se pasa on_output, recibe cada evento de salida (ver stream_command)
+        mientras el proceso sigue corriendo. La ejecución espera turno en el
+        planificador; on_queue(posición) avisa mientras está en cola.
+        
+        Las herramientas de reconocimiento idempotentes (whois, dig, ...) se
+        responden desde la caché si hay un resultado vigente. use_cache=False
+        o el parámetro "no_cache" fuerzan una ejecución nueva.
+        
+        Llamadas idénticas simultáneas del mismo usuario comparten un solo
+        proceso: las que llegan después reciben la salida y los avisos de
+        cola desde ese momento y el mismo resultado. El proceso solo se corta
+        si todas se cancelan. Usuarios distintos no comparten ejecución: cada
+        una ocupa el cupo de su propio usuario en el planificador.
+        """
+        if "no_cache" in parameters:
+            parameters = dict(parameters)
+            use_cache = use_cache and not parse_bool(parameters.pop("no_cache"))
+        
+        cache_key = None
+        if self.cache is not None and self.cache.cacheable(tool_name):
+            cache_key = make_cache_key(tool_name, parameters)
+            if use_cache:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    return cached
+        
+        flight_key = (user_id, cache_key or make_cache_key(tool_name, parameters))
+        flight = self._inflight.get(flight_key)
+        if flight is None:
+            flight = self._inflight[flight_key] = _Flight()
+            flight.task = asyncio.create_task(self._run_flight(
+                flight_key, flight, tool_name, parameters, user_id, cache_key
+            ))
+        elif on_queue is not None and flight.position is not None:
+            # Se une a una ejecución ya encolada (o en marcha): avisar dónde está
+            await on_queue(flight.position)
+        
+        if on_output is not None:
+            flight.listeners.append(on_output)
+        if on_queue is not None:
+            flight.queue_listeners.append(on_queue)
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            # Solo la última llamada que espera corta el proceso
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+                await asyncio.gather(flight.task, return_exceptions=True)
+            raise
+        finally:
+            flight.waiters -= 1
+            if on_output is not None:
+                flight.listeners.remove(on_output)
+            if on_queue is not None:
+                flight.queue_listeners.remove(on_queue)
+    
+    async def _run_flight(self, flight_key, flight, tool_name, parameters, user_id, cache_key) -> str:
+        """Ejecución real detrás de execute_tool"""
+        try:
+            async with self.scheduler.slot(tool_name, user_id, flight.fan_out_queue):
+                token = _output_listener.set(flight.fan_out)
+                user_token = _current_user.set(user_id)
+                try:
+                    result = await self._dispatch_tool(tool_name, parameters)
+                finally:
+                    _current_user.reset(user_token)
+                    _output_listener.reset(token)
+            
+            if cache_key is not None:
+                self.cache.put(cache_key, tool_name, result)
+            return result
+        finally:
+            if self._inflight.get(flight_key) is flight:
+                del self._inflight[flight_key]
+    
+    async def stream_tool(self, tool_name: str, parameters: Dict, user_id: Optional[int] = None) -> AsyncIterator[Dict]:
+        """
+        Ejecuta una herramienta como iterador asíncrono de eventos de salida.
+        El último evento es {"type": "result", "result": <JSON de execute_tool>}.
+        """
+        queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        
+        async def run():
+            try:
+                result = await self.execute_tool(tool_name, parameters, on_output=queue.put, user_id=user_id)
+            except Exception as e:
+                result = self._format_result({"success": False, "error": str(e)})
+            await queue.put({"type": "result", "result": result})
+        
+        task = asyncio.create_task(run())
+        try:
+            while True:
+                event = await queue.get()
+                yield event
+                if event["type"] == "result":
+                    break
+        finally:
+            if not task.done():
+                task.cancel()
+    
+    async def _dispatch_tool(self, tool_name: str, parameters: Dict) -> str:
+        """Despacha la herramienta a su método específico o al genérico"""
         # Mapeo de herramientas a métodos
         tool_methods = {
             "nmap": self.execute_nmap,
             "nikto": self.execute_nikto,
             "gobuster": self.execute_gobuster,
+            "dirb": self.execute_dirb,
             "sqlmap": self.execute_sqlmap,
             "whatweb": self.execute_whatweb,
             "hydra": self.execute_hydra,
@@ -317,7 +851,7 @@ class ToolExecutor:
     
     async def _execute_generic_tool(self, tool_name: str, parameters: Dict) -> str:
         """Ejecuta una herramienta genérica"""
-        # Construir comando básico
+        # Construir comando básico (por shell: los parámetros libres pueden traer sintaxis de shell)
         args = " ".join([f"{v}" for v in parameters.values()])
         command = f"{tool_name} {args}"
         
@@ -0,0 +1,198 @@
+"""
+tool_jobs.py - Ejecución de herramientas en segundo plano con IDs de trabajo
+"""
+
+import asyncio
+import json
+import secrets
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from config import JOB_HISTORY_SIZE, JOB_OUTPUT_TAIL_CHARS
+from tool_executor import get_tool_executor
+
+JobCallback = Callable[["ToolJob"], Awaitable[None]]
+
+# Estados de un trabajo
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+FINISHED_STATES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+
+class ToolJob:
+    """Una herramienta lanzada en segundo plano"""
+    
+    def __init__(self, job_id: str, tool_name: str, parameters: Dict, user_id=None):
+        self.id = job_id
+        self.tool_name = tool_name
+        self.parameters = parameters
+        self.user_id = user_id
+        self.status = JOB_QUEUED
+        self.position = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None  # JSON de execute_tool al terminar
+        self.task = None
+        self._tail = deque()
+        self._tail_size = 0
+        self.output_chars = 0
+    
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+    
+    def record_output(self, data: str):
+        """Guarda la cola de la salida para consultas parciales"""
+        self.output_chars += len(data)
+        self._tail.append(data)
+        self._tail_size += len(data)
+        while self._tail_size > JOB_OUTPUT_TAIL_CHARS and len(self._tail) > 1:
+            self._tail_size -= len(self._tail.popleft())
+    
+    def partial_output(self, chars: int = JOB_OUTPUT_TAIL_CHARS) -> str:
+        """Últimos caracteres de salida recibidos hasta ahora"""
+        return "".join(self._tail)[-chars:]
+    
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+    
+    def to_dict(self) -> Dict:
+        """Resumen del trabajo (sin la salida)"""
+        return {
+            "job_id": self.id,
+            "tool": self.tool_name,
+            "status": self.status,
+            "position": self.position,
+            "user_id": self.user_id,
+            "elapsed": round(self.elapsed(), 1),
+            "output_chars": self.output_chars
+        }
+
+
+class JobManager:
+    """
+    Lanza herramientas como tareas de fondo y permite consultarlas o
+    cancelarlas por ID. Cancelar un trabajo cancela su tarea, y
+    stream_command mata el grupo de procesos completo (salvo que otra
+    llamada idéntica siga esperando el mismo proceso).
+    """
+    
+    def __init__(self, executor=None, history_size: int = JOB_HISTORY_SIZE):
+        self.executor = executor or get_tool_executor()
+        self.history_size = history_size
+        self.jobs = OrderedDict()  # job_id -> ToolJob, del más viejo al más nuevo
+    
+    def submit(
+        self,
+        tool_name: str,
+        parameters: Dict,
+        user_id=None,
+        on_output: Optional[Callable[[Dict], Awaitable[None]]] = None,
+        on_queue: Optional[Callable[[int], Awaitable[None]]] = None,
+        on_done: Optional[JobCallback] = None
+    ) -> ToolJob:
+        """Lanza la herramienta en segundo plano y devuelve el trabajo al instante"""
+        job_id = secrets.token_hex(3)
+        while job_id in self.jobs:
+            job_id = secrets.token_hex(3)
+        
+        job = ToolJob(job_id, tool_name, parameters, user_id)
+        self.jobs[job_id] = job
+        job.task = asyncio.create_task(self._run(job, on_output, on_queue, on_done))
+        self._trim_history()
+        return job
+    
+    async def _run(self, job: ToolJob, on_output, on_queue, on_done):
+        async def job_output(event: Dict):
+            if event["type"] in ("stdout", "stderr"):
+                job.record_output(event["data"])
+            if on_output is not None:
+                await on_output(event)
+        
+        async def job_queue(position: int):
+            # Posición 0: el planificador le dio turno
+            job.position = position or None
+            job.status = JOB_QUEUED if position else JOB_RUNNING
+            job.started_at = None if position else time.time()
+            if on_queue is not None:
+                await on_queue(position)
+        
+        job.status = JOB_RUNNING
+        job.started_at = time.time()
+        try:
+            job.result = await self.executor.execute_tool(
+                job.tool_name,
+                job.parameters,
+                on_output=job_output,
+                user_id=job.user_id,
+                on_queue=job_queue
+            )
+            success = json.loads(job.result).get("success", False)
+            job.status = JOB_DONE if success else JOB_FAILED
+        except asyncio.CancelledError:
+            job.status = JOB_CANCELLED
+            job.result = json.dumps({"success": False, "error": "Trabajo cancelado"}, indent=2)
+        except Exception as e:
+            job.status = JOB_FAILED
+            job.result = json.dumps({"success": False, "error": str(e)}, indent=2)
+        finally:
+            job.position = None
+            job.finished_at = time.time()
+        
+        if on_done is not None:
+            try:
+                await on_done(job)
+            except Exception as e:
+                print(f"⚠️ Error notificando el trabajo {job.id}: {e}")
+    
+    def get(self, job_id: str) -> Optional[ToolJob]:
+        return self.jobs.get(job_id)
+    
+    def list_jobs(self, user_id=None, include_finished: bool = True) -> List[ToolJob]:
+        """Trabajos de un usuario (o todos), del más nuevo al más viejo"""
+        return [
+            job for job in reversed(self.jobs.values())
+            if (user_id is None or job.user_id == user_id)
+            and (include_finished or not job.finished)
+        ]
+    
+    async def cancel(self, job_id: str) -> bool:
+        """Cancela un trabajo en curso; devuelve False si no existe o ya terminó"""
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.task.cancel()
+        try:
+            await job.task
+        except asyncio.CancelledError:
+            pass
+        return True
+    
+    def _trim_history(self):
+        """Olvida los trabajos terminados más viejos"""
+        excess = len(self.jobs) - self.history_size
+        for job_id in list(self.jobs):
+            if excess <= 0:
+                break
+            if self.jobs[job_id].finished:
+                del self.jobs[job_id]
+                excess -= 1
+
+
+# Singleton
+_job_manager = None
+
+def get_job_manager():
+    """Obtiene la instancia global del gestor de trabajos"""
+    global _job_manager
+    if _job_manager is None:
+        _job_manager = JobManager()
+    return _job_manager
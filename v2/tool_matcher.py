@@ -0,0 +1,153 @@
+"""
+tool_matcher.py - Resolución de nombres de herramientas propuestos por la IA
+"""
+
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+# Nombre propuesto -> ejecutables equivalentes, en orden de preferencia
+TOOL_ALIASES = {
+    "netcat": ["nc", "ncat", "netcat.openbsd", "netcat.traditional"],
+    "nc": ["netcat", "ncat"],
+    "ncat": ["nc", "netcat"],
+    "metasploit": ["msfconsole"],
+    "metasploit-framework": ["msfconsole", "msfvenom"],
+    "msf": ["msfconsole"],
+    "msfpayload": ["msfvenom"],
+    "john-the-ripper": ["john"],
+    "johntheripper": ["john"],
+    "theharvester": ["theHarvester"],
+    "the-harvester": ["theHarvester"],
+    "set": ["setoolkit"],
+    "social-engineer-toolkit": ["setoolkit"],
+    "exploitdb": ["searchsploit"],
+    "exploit-db": ["searchsploit"],
+    "aircrack": ["aircrack-ng"],
+    "airodump": ["airodump-ng"],
+    "aireplay": ["aireplay-ng"],
+    "wireshark": ["tshark"],
+    "volatility": ["vol", "volatility3", "vol.py"],
+    "volatility3": ["vol", "volatility"],
+    "python": ["python3"],
+    "recon": ["recon-ng"],
+    "snmpcheck": ["snmp-check"],
+    "arpscan": ["arp-scan"],
+    "enum4linux-ng": ["enum4linux"],
+}
+
+# Candidatos por trigramas que se comparan con distancia de edición
+FUZZY_CANDIDATES = 10
+
+
+def _trigrams(name: str) -> List[str]:
+    """Trigramas del nombre con marcas de inicio y fin"""
+    padded = f"^{name}$"
+    return list({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+def _edit_distance(a: str, b: str) -> int:
+    """Distancia de Damerau-Levenshtein (transposiciones adyacentes cuentan 1)"""
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous2 is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        previous2, previous = previous, current
+    return previous[len(b)]
+
+
+def normalize_tool_name(name: str) -> str:
+    """Normaliza lo que propone la IA: minúsculas, sin espacios ni guiones bajos"""
+    return name.strip().lower().replace(" ", "-").replace("_", "-")
+
+
+class ToolNameMatcher:
+    """
+    Índice en memoria para resolver nombres de herramientas sin lanzar
+    procesos: exacto, por alias y difuso. Los trigramas (coeficiente de Dice)
+    preseleccionan candidatos y la distancia de edición decide la confianza.
+    """
+    
+    def __init__(self, names: Iterable[str], aliases: Optional[Dict[str, List[str]]] = None):
+        self._names = sorted(set(names))
+        self._exact = set(self._names)
+        self._lower = {}
+        for name in self._names:
+            self._lower.setdefault(normalize_tool_name(name), name)
+        self._aliases = TOOL_ALIASES if aliases is None else aliases
+        
+        self._postings = {}  # trigrama -> array de ids
+        self._sizes = array("H")
+        for name_id, name in enumerate(self._names):
+            grams = _trigrams(name.lower())
+            self._sizes.append(len(grams))
+            for gram in grams:
+                posting = self._postings.get(gram)
+                if posting is None:
+                    posting = self._postings[gram] = array("I")
+                posting.append(name_id)
+    
+    def __len__(self) -> int:
+        return len(self._names)
+    
+    def resolve(self, proposed: str, min_confidence: float = 0.0) -> Optional[Dict]:
+        """
+        Devuelve {"tool", "confidence", "method"} con el nombre canónico,
+        o None si nada supera min_confidence
+        """
+        if not proposed:
+            return None
+        
+        if proposed in self._exact:
+            return {"tool": proposed, "confidence": 1.0, "method": "exact"}
+        
+        normalized = normalize_tool_name(proposed)
+        if normalized in self._lower:
+            return {"tool": self._lower[normalized], "confidence": 0.98, "method": "exact"}
+        
+        for candidate in self._aliases.get(normalized, []):
+            if candidate in self._exact:
+                return {"tool": candidate, "confidence": 0.95, "method": "alias"}
+        
+        match = self._fuzzy(normalized)
+        if match and match["confidence"] >= min_confidence:
+            return match
+        return None
+    
+    def _fuzzy(self, normalized: str) -> Optional[Dict]:
+        grams = _trigrams(normalized)
+        if not grams:
+            return None
+        
+        shared = {}
+        for gram in grams:
+            for name_id in self._postings.get(gram, ()):
+                shared[name_id] = shared.get(name_id, 0) + 1
+        if not shared:
+            return None
+        
+        candidates = sorted(
+            shared.items(),
+            key=lambda item: 2.0 * item[1] / (len(grams) + self._sizes[item[0]]),
+            reverse=True
+        )[:FUZZY_CANDIDATES]
+        
+        best_id, best_score = None, 0.0
+        for name_id, count in candidates:
+            name = self._names[name_id].lower()
+            dice = 2.0 * count / (len(grams) + self._sizes[name_id])
+            similarity = 1.0 - _edit_distance(normalized, name) / max(len(normalized), len(name))
+            score = max(dice, similarity)
+            if score > best_score:
+                best_id, best_score = name_id, score
+        
+        return {
+            "tool": self._names[best_id],
+            "confidence": round(best_score, 3),
+            "method": "fuzzy"
+        }
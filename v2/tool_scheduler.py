@@ -0,0 +1,213 @@
+"""
+tool_scheduler.py - Planificador de ejecuciones con límites por herramienta y usuario
+"""
+
+import asyncio
+import itertools
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from config import (
+    SCHEDULER_CAPACITY,
+    SCHEDULER_MAX_PER_USER,
+    TOOL_WEIGHTS,
+    WEIGHT_COST,
+    WEIGHT_TOOL_LIMIT
+)
+
+QueueCallback = Callable[[int], Awaitable[None]]
+
+
+class _Ticket:
+    """Una ejecución esperando turno"""
+    
+    _ids = itertools.count(1)
+    
+    def __init__(self, tool_name: str, user_id, weight: str, cost: int, on_queue: Optional[QueueCallback]):
+        self.id = next(self._ids)
+        self.tool_name = tool_name
+        self.user_id = user_id
+        self.weight = weight
+        self.cost = cost
+        self.on_queue = on_queue
+        self.future = asyncio.get_running_loop().create_future()
+        self.position = None
+
+
+class ToolScheduler:
+    """
+    Reparte la capacidad de la máquina entre las ejecuciones.
+    
+    - Capacidad global en unidades de peso (masscan cuesta más que dig)
+    - Límite de ejecuciones simultáneas por herramienta según su peso
+    - Límite de ejecuciones simultáneas por usuario
+    - Cola justa: se atiende a los usuarios por turnos (round-robin)
+    """
+    
+    def __init__(
+        self,
+        capacity: int = SCHEDULER_CAPACITY,
+        max_per_user: int = SCHEDULER_MAX_PER_USER
+    ):
+        self.capacity = capacity
+        self.max_per_user = max_per_user
+        self.used = 0
+        self.running_by_tool = {}
+        self.running_by_user = {}
+        self._queues = OrderedDict()  # usuario -> deque de tickets, en orden de turno
+    
+    def weight_of(self, tool_name: str) -> str:
+        """Clase de peso de una herramienta (light, medium, heavy)"""
+        return TOOL_WEIGHTS.get(tool_name, TOOL_WEIGHTS.get("default", "medium"))
+    
+    def queued(self) -> int:
+        """Ejecuciones esperando turno"""
+        return sum(len(queue) for queue in self._queues.values())
+    
+    def running(self) -> int:
+        """Ejecuciones en curso"""
+        return sum(self.running_by_user.values())
+    
+    @asynccontextmanager
+    async def slot(self, tool_name: str, user_id=None, on_queue: Optional[QueueCallback] = None):
+        """
+        Espera turno para ejecutar una herramienta.
+        on_queue(posición) se llama al encolar, cada vez que la posición cambia
+        y con 0 cuando le llega el turno.
+        """
+        ticket = await self.acquire(tool_name, user_id, on_queue)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+    
+    async def acquire(self, tool_name: str, user_id=None, on_queue: Optional[QueueCallback] = None) -> _Ticket:
+        weight = self.weight_of(tool_name)
+        cost = min(WEIGHT_COST.get(weight, 1), self.capacity)
+        ticket = _Ticket(tool_name, user_id, weight, cost, on_queue)
+        
+        self._queues.setdefault(user_id, deque()).append(ticket)
+        self._dispatch()
+        
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            if ticket.future.done() and not ticket.future.cancelled():
+                # Se le asignó turno justo al cancelar: devolverlo
+                self.release(ticket)
+            else:
+                self._remove(ticket)
+                self._dispatch()
+            raise
+        return ticket
+    
+    def release(self, ticket: _Ticket):
+        """Libera la capacidad de una ejecución terminada"""
+        self.used -= ticket.cost
+        self.running_by_tool[ticket.tool_name] -= 1
+        self.running_by_user[ticket.user_id] -= 1
+        self._dispatch()
+    
+    def _within_limits(self, ticket: _Ticket) -> bool:
+        """Límites por herramienta y por usuario (sin mirar la capacidad)"""
+        tool_limit = WEIGHT_TOOL_LIMIT.get(ticket.weight, 1)
+        return (
+            self.running_by_tool.get(ticket.tool_name, 0) < tool_limit
+            and self.running_by_user.get(ticket.user_id, 0) < self.max_per_user
+        )
+    
+    def _fits(self, ticket: _Ticket, reserved: int = 0) -> bool:
+        return self.used + reserved + ticket.cost <= self.capacity and self._within_limits(ticket)
+    
+    def _start(self, ticket: _Ticket):
+        self.used += ticket.cost
+        self.running_by_tool[ticket.tool_name] = self.running_by_tool.get(ticket.tool_name, 0) + 1
+        self.running_by_user[ticket.user_id] = self.running_by_user.get(ticket.user_id, 0) + 1
+        ticket.future.set_result(None)
+        # Si estuvo en cola, avisar que ya tiene turno (posición 0)
+        if ticket.position is not None and ticket.on_queue is not None:
+            asyncio.get_running_loop().create_task(ticket.on_queue(0))
+    
+    def _remove(self, ticket: _Ticket):
+        queue = self._queues.get(ticket.user_id)
+        if queue and ticket in queue:
+            queue.remove(ticket)
+            if not queue:
+                del self._queues[ticket.user_id]
+    
+    def _next_ticket(self, queue, reserved: int):
+        """
+        Primer ticket de la cola que cabe. Devuelve (ticket, reserva): el
+        primero que solo espera capacidad la reserva, así lo que viene
+        detrás no le gana las unidades que le faltan.
+        """
+        for ticket in queue:
+            if self._fits(ticket, reserved):
+                return ticket, reserved
+            if not reserved and self._within_limits(ticket):
+                reserved = ticket.cost
+        return None, reserved
+    
+    def _dispatch(self):
+        """
+        Arranca todo lo que quepa, atendiendo a los usuarios por turnos.
+        Si al primero en turno le falta capacidad, se le reservan las
+        unidades: una racha de ejecuciones livianas no lo deja esperando.
+        """
+        progress = True
+        while progress and self._queues:
+            progress = False
+            reserved = 0
+            for user_id in list(self._queues):
+                queue = self._queues[user_id]
+                ticket, reserved = self._next_ticket(queue, reserved)
+                if ticket is None:
+                    continue
+                queue.remove(ticket)
+                # El usuario atendido pasa al final del turno
+                del self._queues[user_id]
+                if queue:
+                    self._queues[user_id] = queue
+                self._start(ticket)
+                progress = True
+                break
+        
+        self._notify_positions()
+    
+    def _round_robin_order(self) -> List[_Ticket]:
+        """Orden en que se atendería la cola si no hubiera otros límites"""
+        order = []
+        queues = [list(queue) for queue in self._queues.values()]
+        for depth in range(max((len(q) for q in queues), default=0)):
+            for queue in queues:
+                if depth < len(queue):
+                    order.append(queue[depth])
+        return order
+    
+    def _notify_positions(self):
+        for position, ticket in enumerate(self._round_robin_order(), 1):
+            if ticket.position != position:
+                ticket.position = position
+                if ticket.on_queue is not None:
+                    asyncio.get_running_loop().create_task(ticket.on_queue(position))
+    
+    def status(self) -> Dict:
+        """Resumen del estado para /status"""
+        return {
+            "capacity": self.capacity,
+            "used": self.used,
+            "running": self.running(),
+            "queued": self.queued()
+        }
+
+
+# Singleton
+_tool_scheduler = None
+
+def get_tool_scheduler():
+    """Obtiene la instancia global del planificador"""
+    global _tool_scheduler
+    if _tool_scheduler is None:
+        _tool_scheduler = ToolScheduler()
+    return _tool_scheduler
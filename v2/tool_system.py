@@ -4,12 +4,45 @@ tool_system.py - Operaciones de sistema para el bot (descargas, instalaciones, a
 
 import os
 import asyncio
+import signal
 import subprocess
 import shutil
 from pathlib import Path
 from typing import Dict, Optional
 import json
 
+from config import PROCESS_KILL_GRACE
+
+
+def _signal_group(process, sig: int):
+    """Envía una señal al grupo del proceso (o solo al proceso si no se puede)"""
+    try:
+        os.killpg(process.pid, sig)
+    except (ProcessLookupError, PermissionError):
+        try:
+            process.send_signal(sig)
+        except ProcessLookupError:
+            pass
+
+
+async def terminate_process(process, grace: float = PROCESS_KILL_GRACE):
+    """
+    Termina un proceso lanzado con start_new_session=True y todo su grupo:
+    SIGTERM, espera grace segundos, SIGKILL. Lo reapea y cierra su stdin;
+    el loop cierra el transporte solo cuando el proceso terminó.
+    """
+    if process.returncode is None:
+        _signal_group(process, signal.SIGTERM)
+        try:
+            await asyncio.wait_for(process.wait(), timeout=grace)
+        except asyncio.TimeoutError:
+            _signal_group(process, signal.SIGKILL)
+            await process.wait()
+    
+    if process.stdin is not None:
+        process.stdin.close()
+
+
 class ToolSystemManager:
     """Maneja operaciones de sistema: archivos, descargas, instalaciones"""
     
@@ -31,7 +64,8 @@ class ToolSystemManager:
             process = await asyncio.create_subprocess_shell(
                 command,
                 stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True
             )
             
             try:
@@ -48,7 +82,7 @@ class ToolSystemManager:
                     "returncode": process.returncode
                 }
             except asyncio.TimeoutError:
-                process.kill()
+                await terminate_process(process)
                 return {
                     "success": False,
                     "command": command.replace(self.root_password, "***") if self.root_password else command,
@@ -0,0 +1,221 @@
+"""
+tool_watcher.py - Vigila los directorios de binarios para detectar altas y bajas
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+from typing import Callable, List, Optional, Set
+
+# Constantes de inotify (linux/inotify.h)
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+    IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def _load_inotify():
+    """Carga inotify desde libc; None si no está disponible (no Linux)"""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class BinDirWatcher:
+    """
+    Avisa qué nombres cambiaron en los directorios vigilados.
+    Usa inotify y, si no se puede, compara el listado de cada directorio
+    cuyo mtime cambió.
+    """
+    
+    def __init__(
+        self,
+        directories: List[str],
+        on_change: Callable[[str], None],
+        on_overflow: Optional[Callable[[], None]] = None,
+        poll_interval: float = 5.0
+    ):
+        self.directories = []
+        seen = set()
+        for directory in directories:
+            real_dir = os.path.realpath(directory)
+            if real_dir not in seen and os.path.isdir(directory):
+                seen.add(real_dir)
+                self.directories.append(directory)
+        
+        self.on_change = on_change
+        self.on_overflow = on_overflow
+        self.poll_interval = poll_interval
+        self.mode = None
+        
+        self._fd = None
+        self._watches = {}  # wd -> directorio
+        self._dir_state = {}  # directorio -> (mtime_ns, nombres)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def start(self) -> str:
+        """Arranca la vigilancia en un hilo de fondo; devuelve el modo usado"""
+        if self._thread and self._thread.is_alive():
+            return self.mode
+        
+        self._stop.clear()
+        if self._start_inotify():
+            self.mode = "inotify"
+        else:
+            self.mode = "polling"
+            for directory in self.directories:
+                self._dir_state[directory] = self._list_directory(directory)
+        
+        self._thread = threading.Thread(target=self._run, name="bin-watcher", daemon=True)
+        self._thread.start()
+        return self.mode
+    
+    def stop(self):
+        """Detiene la vigilancia y libera el descriptor de inotify"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+    
+    def process_pending(self) -> int:
+        """Procesa los cambios pendientes ya mismo; devuelve cuántos nombres cambiaron"""
+        with self._lock:
+            if self.mode == "inotify":
+                names, overflow = self._read_inotify()
+            else:
+                names, overflow = self._poll_directories(), False
+        
+        if overflow and self.on_overflow:
+            self.on_overflow()
+            return len(names)
+        
+        for name in names:
+            self.on_change(name)
+        return len(names)
+    
+    # === INOTIFY ===
+    
+    def _start_inotify(self) -> bool:
+        libc = _load_inotify()
+        if libc is None:
+            return False
+        
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return False
+        
+        for directory in self.directories:
+            wd = libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK)
+            if wd >= 0:
+                self._watches[wd] = directory
+        
+        if not self._watches:
+            os.close(fd)
+            return False
+        
+        self._fd = fd
+        return True
+    
+    def _read_inotify(self):
+        names = set()
+        overflow = False
+        if self._fd is None:
+            return names, overflow
+        
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            except OSError:
+                break
+            if not data:
+                break
+            
+            offset = 0
+            while offset + EVENT_HEADER.size <= len(data):
+                wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                raw_name = data[offset:offset + length]
+                offset += length
+                
+                if mask & (IN_Q_OVERFLOW | IN_DELETE_SELF | IN_MOVE_SELF):
+                    overflow = True
+                    continue
+                name = os.fsdecode(raw_name.rstrip(b"\0"))
+                if name:
+                    names.add(name)
+        
+        return names, overflow
+    
+    # === POLLING ===
+    
+    def _list_directory(self, directory: str):
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+            with os.scandir(directory) as entries:
+                names = {entry.name for entry in entries}
+        except OSError:
+            return (None, set())
+        return (mtime, names)
+    
+    def _poll_directories(self) -> Set[str]:
+        changed = set()
+        for directory in self.directories:
+            old_mtime, old_names = self._dir_state.get(directory, (None, set()))
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime == old_mtime:
+                continue
+            
+            # Solo se vuelve a listar el directorio que cambió
+            state = self._list_directory(directory)
+            self._dir_state[directory] = state
+            changed |= old_names ^ state[1]
+        return changed
+    
+    # === HILO ===
+    
+    def _run(self):
+        while not self._stop.is_set():
+            if self.mode == "inotify":
+                try:
+                    ready, _, _ = select.select([self._fd], [], [], 1.0)
+                except (OSError, ValueError, TypeError):
+                    break
+                if not ready:
+                    continue
+            elif self._stop.wait(self.poll_interval):
+                break
+            
+            try:
+                self.process_pending()
+            except Exception as e:
+                print(f"⚠️  Error vigilando binarios: {e}")
@@ -0,0 +1,187 @@
+"""
+web_parsers.py - Hallazgos compactos de nikto (-Format json) y whatweb (--log-json)
+
+Convierten la salida para máquinas de cada herramienta en diccionarios de
+pocos KB que se pueden mandar a la IA, mostrar en Telegram o guardar.
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from config import FINDINGS_RETURNED
+
+MSG_MAX_CHARS = 300
+
+# Plugins de whatweb que pasan a campos propios o no aportan
+_WHATWEB_FIELDS = {"Title": "title", "IP": "ip", "HTTPServer": "server", "Country": "country"}
+_WHATWEB_SKIP = {"RedirectLocation"}
+
+
+def _strip_trailing_commas(text: str) -> str:
+    """Quita las comas sobrantes antes de ] y } (nikto 2.1.x) sin tocar el contenido de los strings"""
+    out = []
+    comma = None  # posición en out de la última coma fuera de strings
+    in_string = escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif not char.isspace():
+            if char in "]}" and comma is not None:
+                out[comma] = ""
+            comma = len(out) if char == "," else None
+            in_string = char == '"'
+        out.append(char)
+    return "".join(out)
+
+
+def _load_json(source: Union[str, Path]):
+    """JSON de una ruta o texto; tolera comas sobrantes y salidas cortadas"""
+    text = Path(source).read_text(errors="ignore") if isinstance(source, Path) else source
+    text = text.strip()
+    if not text:
+        return None
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    
+    text = _strip_trailing_commas(text)
+    # Lista sin cerrar (escaneo cortado): cerrarla tras el último objeto completo
+    if text.startswith("[") and not text.endswith("]"):
+        text = text[:text.rfind("}") + 1] + "]"
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+
+def _as_list(data) -> List:
+    if data is None:
+        return []
+    return data if isinstance(data, list) else [data]
+
+
+# === NIKTO ===
+
+def parse_nikto(source: Union[str, Path]) -> Optional[List[Dict]]:
+    """
+    Hosts de un reporte JSON de nikto con sus hallazgos:
+    [{"host", "ip", "port", "banner", "findings": [{"id", "method", "url", "msg"}]}]
+    None si no hay JSON válido.
+    """
+    data = _load_json(source)
+    if data is None:
+        return None
+    
+    hosts = []
+    for entry in _as_list(data):
+        if not isinstance(entry, dict):
+            continue
+        findings = []
+        for vuln in entry.get("vulnerabilities", []):
+            finding = {
+                "id": str(vuln.get("id", "")),
+                "method": vuln.get("method", ""),
+                "url": vuln.get("url", ""),
+                "msg": (vuln.get("msg") or "")[:MSG_MAX_CHARS]
+            }
+            references = vuln.get("references") or vuln.get("OSVDB")
+            if references and references != "0":
+                finding["refs"] = references
+            findings.append({k: v for k, v in finding.items() if v})
+        
+        hosts.append({
+            "host": entry.get("host", ""),
+            "ip": entry.get("ip", ""),
+            "port": str(entry.get("port", "")),
+            "banner": entry.get("banner", ""),
+            "findings_count": len(findings),
+            "findings": findings[:FINDINGS_RETURNED]
+        })
+    return hosts
+
+
+def render_nikto(hosts: List[Dict]) -> str:
+    """Texto legible: un bloque por host con sus hallazgos"""
+    lines = []
+    for host in hosts:
+        banner = f" - {host['banner']}" if host["banner"] else ""
+        lines.append(f"Nikto: {host['host']} ({host['ip']}:{host['port']}){banner}")
+        lines.append(f"{host['findings_count']} hallazgos")
+        for finding in host["findings"]:
+            url = f"{finding.get('method', 'GET')} {finding['url']}: " if finding.get("url") else ""
+            lines.append(f"  - {url}{finding.get('msg', '')}")
+        if host["findings_count"] > len(host["findings"]):
+            lines.append(f"  ... y {host['findings_count'] - len(host['findings'])} más")
+        lines.append("")
+    return "\n".join(lines)
+
+
+# === WHATWEB ===
+
+def _plugin_values(plugin: Dict) -> List[str]:
+    """Versiones del plugin o, si no hay, los textos que detectó"""
+    values = []
+    for field in ("version", "os", "string", "module", "account"):
+        for value in plugin.get(field, []):
+            value = str(value)
+            if value and value not in values:
+                values.append(value)
+        if values and field == "version":
+            break
+    return values
+
+
+def parse_whatweb(source: Union[str, Path]) -> Optional[List[Dict]]:
+    """
+    Objetivos de un log JSON de whatweb:
+    [{"target", "status", "title", "ip", "server", "country", "technologies": {plugin: "v1, v2"}}]
+    None si no hay JSON válido.
+    """
+    data = _load_json(source)
+    if data is None:
+        return None
+    
+    targets = []
+    for entry in _as_list(data):
+        if not isinstance(entry, dict) or "target" not in entry:
+            continue
+        target = {"target": entry["target"], "status": entry.get("http_status")}
+        technologies = {}
+        for name, plugin in (entry.get("plugins") or {}).items():
+            if name in _WHATWEB_SKIP:
+                continue
+            values = _plugin_values(plugin or {})
+            if name in _WHATWEB_FIELDS:
+                target[_WHATWEB_FIELDS[name]] = ", ".join(values)
+            else:
+                technologies[name] = ", ".join(values)
+        redirect = (entry.get("plugins") or {}).get("RedirectLocation", {}).get("string")
+        if redirect:
+            target["redirect"] = redirect[0]
+        target["technologies"] = technologies
+        targets.append({k: v for k, v in target.items() if v not in ("", None)})
+    return targets
+
+
+def render_whatweb(targets: List[Dict]) -> str:
+    """Texto legible: una línea de resumen por objetivo y sus tecnologías"""
+    lines = []
+    for target in targets:
+        header = f"{target['target']} [{target.get('status', '?')}]"
+        if target.get("title"):
+            header += f" {target['title']}"
+        lines.append(header)
+        for field in ("ip", "server", "country", "redirect"):
+            if target.get(field):
+                lines.append(f"  {field}: {target[field]}")
+        for name, version in target.get("technologies", {}).items():
+            lines.append(f"  - {name} {version}".rstrip())
+        lines.append("")
+    return "\n".join(lines)